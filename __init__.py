@@ -16,20 +16,23 @@ if "bpy" in locals():
         importlib.reload(import_avorion_xml)
     if "avorion_utils" in locals():
         importlib.reload(avorion_utils)
+    if "ship_library" in locals():
+        importlib.reload(ship_library)
+    if "watch" in locals():
+        importlib.reload(watch)
 
 
 import bpy
-from bpy.props import BoolProperty, FloatProperty, StringProperty, EnumProperty
+from bpy.props import BoolProperty, FloatProperty, FloatVectorProperty, IntProperty, StringProperty, EnumProperty
 from bpy.types import Operator, Panel
 from bpy_extras.io_utils import orientation_helper, path_reference_mode, axis_conversion
 
+from . import ship_library, watch
+from .avorion_utils.categories import MATERIALS, SHAPE_NAMES
 
-@orientation_helper(axis_forward='-Z', axis_up='Y')
-class ImportAvorionXML(Operator):
-    bl_idname = "avorion.import_xml"
-    bl_label = "Import Avorion XML"
-    bl_options = {'PRESET', 'UNDO'}
 
+@orientation_helper(axis_forward='-Z', axis_up='Y')
+class ImportAvorionOptions:
     filename_ext = ".xml"
     filter_glob: StringProperty(
         default="*.xml",
@@ -50,18 +53,249 @@ class ImportAvorionXML(Operator):
         default=False
     )
 
+    split_mode: EnumProperty(
+        name="Split",
+        description="Split the merged hull into several Meshes",
+        items=(
+            ('NONE', "None", "Keep the hull in a single Mesh"),
+            ('CATEGORY', "Category", "One Mesh per block category"),
+            ('MATERIAL', "Material", "One Mesh per block material"),
+            ('COMPONENT', "Component", "One Mesh per group of touching blocks, e.g. floating wreckage parts"),
+        ),
+        default='NONE'
+    )
+
+    system_blocks: EnumProperty(
+        name="System Blocks",
+        description="Handling of internal system blocks",
+        items=(
+            ('INCLUDE', "Include", "Import system blocks with the hull"),
+            ('HIDE', "Hide", "Import system blocks into a hidden Mesh"),
+            ('EXCLUDE', "Exclude", "Do not import system blocks"),
+        ),
+        default='INCLUDE'
+    )
+
+    import_turrets: BoolProperty(
+        name="Turrets",
+        description="Import the turrets of ships, identical designs share their data",
+        default=True
+    )
+
+    color_domain: EnumProperty(
+        name="Color Domain",
+        description="Domain of the color attributes",
+        items=(
+            ('FACE', "Face", "One color per face"),
+            ('CORNER', "Face Corner", "One color per face corner, needed for Vertex Paint"),
+        ),
+        default='FACE'
+    )
+
+    material_mode: EnumProperty(
+        name="Materials",
+        description="Assign shared library materials, created once per file",
+        items=(
+            ('NONE', "None", "Do not assign materials"),
+            ('MATERIAL', "Material Tier", "One material per Avorion material tier"),
+            ('CATEGORY', "Category", "One material per block category"),
+            ('PALETTE', "Palette", "One material for the whole design, colors come from a palette texture"),
+        ),
+        default='MATERIAL'
+    )
+
+    uv_density: FloatProperty(
+        name="UV Density",
+        description="Texture repeats per unit of a world space box projection, 0 imports no UVs",
+        default=0.0,
+        min=0.0,
+        soft_max=10.0
+    )
+
+    interior_blocks: EnumProperty(
+        name="Interior Blocks",
+        description="Handling of blocks enclosed by opaque blocks on every side",
+        items=(
+            ('KEEP', "Keep", "Import interior blocks with the hull"),
+            ('HIDE', "Hide", "Import interior blocks into a hidden Mesh"),
+            ('REMOVE', "Remove", "Do not import interior blocks"),
+        ),
+        default='KEEP'
+    )
+
+    symmetry: BoolProperty(
+        name="Mirror Symmetry",
+        description="Detect mirrored halves of the merged hull, mesh one half with a Mirror modifier "
+                    "and the asymmetric rest separately",
+        default=False
+    )
+
+    memory_budget: IntProperty(
+        name="Memory Budget",
+        description="Estimated memory (MiB) an import may use, 0 disables the check",
+        default=0,
+        min=0
+    )
+
+    over_budget: EnumProperty(
+        name="Over Budget",
+        description="What to do if the estimate exceeds the memory budget",
+        items=(
+            ('MERGE', "Merge Blocks", "Fall back to a single merged Mesh, abort if that is still too large"),
+            ('ABORT', "Abort", "Abort the import"),
+        ),
+        default='MERGE'
+    )
+
+    filter_region: BoolProperty(
+        name="Region",
+        description="Only import blocks touching an axis aligned box (Avorion coordinates)",
+        default=False
+    )
+
+    region_min: FloatVectorProperty(
+        name="Min",
+        size=3,
+        default=(-10.0, -10.0, -10.0),
+        subtype='XYZ'
+    )
+
+    region_max: FloatVectorProperty(
+        name="Max",
+        size=3,
+        default=(10.0, 10.0, 10.0),
+        subtype='XYZ'
+    )
+
+    subtree: IntProperty(
+        name="Subtree",
+        description="Only import this block and its children, -1 imports every block",
+        default=-1,
+        min=-1
+    )
+
+    include_categories: StringProperty(
+        name="Include Categories",
+        description="Comma separated block categories to import, empty imports every category",
+        default=""
+    )
+
+    exclude_categories: StringProperty(
+        name="Exclude Categories",
+        description="Comma separated block categories to skip",
+        default=""
+    )
+
+    materials: EnumProperty(
+        name="Materials",
+        description="Block materials to import",
+        items=[(m.name, m.name, "") for m in MATERIALS],
+        default={m.name for m in MATERIALS},
+        options={'ENUM_FLAG'}
+    )
+
+    shapes: EnumProperty(
+        name="Shapes",
+        description="Block shapes to import",
+        items=[(name, name, "") for name in SHAPE_NAMES],
+        default=set(SHAPE_NAMES),
+        options={'ENUM_FLAG'}
+    )
+
+    validation: EnumProperty(
+        name="Validation",
+        description="Check blocks for broken bounds, orientations and types and for overlaps before importing",
+        items=(
+            ('OFF', "Off", "Do not check the blocks"),
+            ('WARN', "Warn", "Report problems and import every block"),
+            ('SKIP', "Skip", "Report problems and do not import broken blocks, overlapping blocks are kept"),
+            ('ABORT', "Abort", "Cancel the import if any block has a problem"),
+        ),
+        default='WARN'
+    )
+
+    watch: BoolProperty(
+        name="Watch File",
+        description="Re-import the design into the same collection whenever Avorion saves it, "
+                    "keeping the transform and the modifiers added since",
+        default=False
+    )
+
+    use_cache: BoolProperty(
+        name="Cache Designs",
+        description="Keep parsed designs and their geometry in memory, "
+                    "so changing options in the redo panel skips parsing",
+        default=True
+    )
+
+    report_timings: BoolProperty(
+        name="Report Timings",
+        description="Report the time spent in each import stage",
+        default=False
+    )
+
+    timing_log: StringProperty(
+        name="Timing Log",
+        description="Write the stage timings as JSON to this file",
+        default="",
+        subtype='FILE_PATH'
+    )
+
+    profile_output: StringProperty(
+        name="Profile Output",
+        description="Dump cProfile statistics of the import to this file",
+        default="",
+        subtype='FILE_PATH'
+    )
+
     def draw(self, context):
         pass
 
-    def execute(self, context):
-        from . import import_avorion_xml
-
-        keywords = self.as_keywords(ignore=("axis_forward", "axis_up", "filter_glob"))
+    def block_filter(self):
+        from .avorion_utils.parser import BlockFilter
+
+        def names(text):
+            return tuple(name.strip() for name in text.split(",") if name.strip())
+
+        block_filter = BlockFilter(
+            lower=tuple(self.region_min) if self.filter_region else None,
+            upper=tuple(self.region_max) if self.filter_region else None,
+            subtree=self.subtree if self.subtree >= 0 else None,
+            include_categories=names(self.include_categories),
+            exclude_categories=names(self.exclude_categories),
+            include_materials=() if len(self.materials) == len(MATERIALS) else
+                tuple(m.index for m in MATERIALS if m.name in self.materials),
+            include_shapes=() if len(self.shapes) == len(SHAPE_NAMES) else tuple(self.shapes),
+        )
+        # nothing selected is not the same as everything selected
+        if not self.materials or not self.shapes:
+            raise ValueError("No materials or shapes selected.")
+
+        return None if block_filter == BlockFilter() else block_filter
+
+    def options(self):
+        from .import_avorion_xml import ImportOptions
+
+        keywords = self.as_keywords(ignore=("axis_forward", "axis_up", "filter_glob", "filepath",
+                                            "report_timings", "timing_log", "profile_output",
+                                            "filter_region", "region_min", "region_max", "subtree",
+                                            "include_categories", "exclude_categories", "materials", "shapes",
+                                            "watch", "background_thread"))
 
         global_matrix = axis_conversion(from_forward=self.axis_forward, from_up=self.axis_up)
-        keywords["global_matrix"] = global_matrix.to_4x4()
+        return ImportOptions(**keywords, global_matrix=global_matrix.to_4x4(), block_filter=self.block_filter())
+
+    def report_import(self, timings, memory):
+        for warning in memory.warnings:
+            self.report({'WARNING'}, warning)
+
+        if self.report_timings:
+            print(f"Avorion import of {self.filepath}:\n{timings.table()}\n{memory.summary()}")
+            self.report({'INFO'}, f"{timings.summary()}, {memory.summary()}")
 
-        return import_avorion_xml.load(context, **keywords)
+        if self.timing_log:
+            timings.dump(bpy.path.abspath(self.timing_log), filepath=self.filepath,
+                         peak_memory=memory.peak, estimated_memory=memory.estimate and memory.estimate.total)
 
     def invoke(self, context, _event):
         from pathlib import Path
@@ -77,6 +311,132 @@ class ImportAvorionXML(Operator):
         return {'RUNNING_MODAL'}
 
 
+class ImportAvorionXML(ImportAvorionOptions, Operator):
+    bl_idname = "avorion.import_xml"
+    bl_label = "Import Avorion XML"
+    bl_options = {'PRESET', 'UNDO'}
+
+    def execute(self, context):
+        from pathlib import Path
+        from . import import_avorion_xml
+        from .avorion_utils.profiling import Timings
+        from .avorion_utils.memory import MemoryBudgetError, MemoryTracker
+        from .avorion_utils.validation import ValidationError
+
+        timings = Timings(enabled=self.report_timings or bool(self.timing_log))
+        memory = MemoryTracker()
+
+        try:
+            options = self.options()
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        snapshot = import_avorion_xml.DataSnapshot(Path(self.filepath).stem)
+        try:
+            if self.profile_output:
+                import cProfile
+
+                profiler = cProfile.Profile()
+                result = profiler.runcall(import_avorion_xml.load, context, self.filepath, options, timings, memory)
+                profiler.dump_stats(bpy.path.abspath(self.profile_output))
+            else:
+                result = import_avorion_xml.load(context, self.filepath, options, timings, memory)
+        except (MemoryBudgetError, ValidationError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        if self.watch:
+            watch.watch_file(self.filepath, options, snapshot.created())
+
+        self.report_import(timings, memory)
+
+        return result
+
+
+class ImportAvorionXMLModal(ImportAvorionOptions, Operator):
+    """Import in time slices while the interface stays responsive, Esc cancels"""
+    bl_idname = "avorion.import_xml_modal"
+    bl_label = "Import Avorion XML (Modal)"
+    bl_options = {'UNDO'}
+
+    # seconds of import work between two redraws
+    time_slice = 0.1
+
+    background_thread: BoolProperty(
+        name="Background Thread",
+        description="Parse and build the geometry in a background thread, "
+                    "only Blender data is created on the main thread",
+        default=True
+    )
+
+    def execute(self, context):
+        from pathlib import Path
+        from . import import_avorion_xml
+        from .avorion_utils.profiling import Timings
+        from .avorion_utils.memory import MemoryTracker
+
+        self._timings = Timings(enabled=self.report_timings or bool(self.timing_log))
+        self._memory = MemoryTracker()
+        self._snapshot = import_avorion_xml.DataSnapshot(Path(self.filepath).stem)
+
+        try:
+            self._options = self.options()
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        steps = import_avorion_xml.background_load_steps if self.background_thread else import_avorion_xml.load_steps
+        self._steps = steps(context, self.filepath, self._options, self._timings, self._memory)
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.0, window=context.window)
+        wm.modal_handler_add(self)
+
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        import time
+
+        if event.type == 'ESC':
+            self.report({'WARNING'}, "Import cancelled")
+            return self.cancel_import(context)
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        deadline = time.perf_counter() + self.time_slice
+        try:
+            while time.perf_counter() < deadline:
+                # None: waiting for the background thread, give the interface back
+                if next(self._steps) is None:
+                    break
+        except StopIteration as e:
+            self.stop_timer(context)
+            if self.watch:
+                watch.watch_file(self.filepath, self._options, self._snapshot.created())
+            self.report_import(self._timings, self._memory)
+            return e.value
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return self.cancel_import(context)
+
+        return {'RUNNING_MODAL'}
+
+    def stop_timer(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+
+    def cancel_import(self, context):
+        self.stop_timer(context)
+        self._steps.close()
+        self._snapshot.restore()
+        return {'CANCELLED'}
+
+    def cancel(self, context):
+        # the modal handler is removed without finishing, e.g. when the file is closed
+        self.cancel_import(context)
+
+
 class AVORION_PT_import_transform(Panel):
     bl_space_type = 'FILE_BROWSER'
     bl_region_type = 'TOOL_PROPS'
@@ -88,7 +448,7 @@ class AVORION_PT_import_transform(Panel):
         sfile = context.space_data
         operator = sfile.active_operator
 
-        return operator.bl_idname == "AVORION_OT_import_xml"
+        return operator.bl_idname in IMPORT_OPERATORS
 
     def draw(self, context):
         layout = self.layout
@@ -102,6 +462,70 @@ class AVORION_PT_import_transform(Panel):
         layout.prop(operator, "axis_up")
 
 
+class AVORION_PT_import_diagnostics(Panel):
+    bl_space_type = 'FILE_BROWSER'
+    bl_region_type = 'TOOL_PROPS'
+    bl_label = "Diagnostics"
+    bl_parent_id = "FILE_PT_operator"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        sfile = context.space_data
+        operator = sfile.active_operator
+
+        return operator.bl_idname in IMPORT_OPERATORS
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+        layout.use_property_decorate = False
+
+        sfile = context.space_data
+        operator = sfile.active_operator
+
+        layout.prop(operator, "validation")
+        layout.prop(operator, "use_cache")
+        layout.prop(operator, "report_timings")
+        layout.prop(operator, "timing_log")
+        layout.prop(operator, "profile_output")
+
+
+class AVORION_PT_import_filter(Panel):
+    bl_space_type = 'FILE_BROWSER'
+    bl_region_type = 'TOOL_PROPS'
+    bl_label = "Filter"
+    bl_parent_id = "FILE_PT_operator"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    @classmethod
+    def poll(cls, context):
+        sfile = context.space_data
+        operator = sfile.active_operator
+
+        return operator.bl_idname in IMPORT_OPERATORS
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+        layout.use_property_decorate = False
+
+        sfile = context.space_data
+        operator = sfile.active_operator
+
+        layout.prop(operator, "filter_region")
+        col = layout.column()
+        col.enabled = operator.filter_region
+        col.prop(operator, "region_min")
+        col.prop(operator, "region_max")
+
+        layout.prop(operator, "subtree")
+        layout.prop(operator, "include_categories")
+        layout.prop(operator, "exclude_categories")
+        layout.prop(operator, "materials")
+        layout.prop(operator, "shapes")
+
+
 class AVORION_PT_import_geometry(Panel):
     bl_space_type = 'FILE_BROWSER'
     bl_region_type = 'TOOL_PROPS'
@@ -113,7 +537,7 @@ class AVORION_PT_import_geometry(Panel):
         sfile = context.space_data
         operator = sfile.active_operator
 
-        return operator.bl_idname == "AVORION_OT_import_xml"
+        return operator.bl_idname in IMPORT_OPERATORS
 
     def draw(self, context):
         layout = self.layout
@@ -124,27 +548,54 @@ class AVORION_PT_import_geometry(Panel):
         operator = sfile.active_operator
 
         layout.prop(operator, "seperate_blocks")
+        layout.prop(operator, "split_mode")
+        layout.prop(operator, "system_blocks")
+        layout.prop(operator, "interior_blocks")
+        layout.prop(operator, "symmetry")
+        layout.prop(operator, "color_domain")
+        layout.prop(operator, "material_mode")
+        layout.prop(operator, "uv_density")
+        layout.prop(operator, "import_turrets")
+        layout.prop(operator, "watch")
+        layout.prop(operator, "memory_budget")
+        layout.prop(operator, "over_budget")
+
+        if operator.bl_idname == "AVORION_OT_import_xml_modal":
+            layout.prop(operator, "background_thread")
+
+
+IMPORT_OPERATORS = ("AVORION_OT_import_xml", "AVORION_OT_import_xml_modal")
 
 
 def menu_func_import(self, context):
     self.layout.operator(ImportAvorionXML.bl_idname, text="Avorion (.xml)")
+    self.layout.operator(ImportAvorionXMLModal.bl_idname, text="Avorion (.xml, modal)")
 
 
 classes = (
     ImportAvorionXML,
+    ImportAvorionXMLModal,
     AVORION_PT_import_transform,
-    AVORION_PT_import_geometry
+    AVORION_PT_import_geometry,
+    AVORION_PT_import_filter,
+    AVORION_PT_import_diagnostics
 )
 
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
 
+    ship_library.register()
+    watch.register()
+
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
 
 def unregister():
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
 
+    watch.unregister()
+    ship_library.unregister()
+
     for cls in classes:
         bpy.utils.unregister_class(cls)
 
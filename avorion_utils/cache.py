@@ -0,0 +1,88 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .geometry import Geometry
+from .memory import BLOCK_BYTES, GEOMETRY_OVERHEAD_BYTES, available_memory
+from .parser import BlockFilter, Ship, Turret
+
+
+__all__ = ["CacheEntry", "DesignCache"]
+
+
+# (path, mtime_ns, size, filter, validation mode)
+CacheKey = tuple[str, int, int, BlockFilter | None, str]
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    design: Ship | Turret
+    # untransformed geometry of the hull blocks, filled on first use
+    geometries: list[Geometry | None] = field(default_factory=list, repr=False)
+    # validation warnings of the parse, reported again on every hit
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def nbytes(self) -> int:
+        blocks = len(self.design.blocks) if isinstance(self.design, Ship) else 0
+        geometries = sum(g.nbytes + GEOMETRY_OVERHEAD_BYTES for g in self.geometries if g is not None)
+        return BLOCK_BYTES * blocks + geometries
+
+
+class DesignCache:
+    # LRU of parsed designs, so re-running an import with other options skips parsing and geometry
+    def __init__(self, max_entries: int = 4, max_bytes: int = 1 << 30, min_available: int = 512 << 20) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.min_available = min_available
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(filepath: str | Path, block_filter: BlockFilter | None = None, validation: str = 'OFF') -> CacheKey:
+        # a design that failed validation is never stored, so an abort is only skipped if the design passed
+        stat = os.stat(filepath)
+        return os.path.realpath(filepath), stat.st_mtime_ns, stat.st_size, block_filter, validation
+
+    def get(self, key: CacheKey) -> CacheEntry | None:
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: CacheKey, design: Ship | Turret, warnings: list[str] | None = None) -> CacheEntry:
+        entry = CacheEntry(design, warnings=list(warnings or ()))
+        if isinstance(design, Ship):
+            entry.geometries = [None] * len(design.blocks)
+
+        with self._lock:
+            # older versions of the same file are stale
+            for stale in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                del self._entries[stale]
+            self._entries[key] = entry
+        self.evict()
+
+        return entry
+
+    def entry_of(self, design: Ship | Turret) -> CacheEntry | None:
+        with self._lock:
+            return next((entry for entry in self._entries.values() if entry.design is design), None)
+
+    def evict(self) -> None:
+        # least recently used first, the newest entry is only dropped under memory pressure
+        with self._lock:
+            while len(self._entries) > self.max_entries or \
+                    (len(self._entries) > 1 and sum(e.nbytes for e in self._entries.values()) > self.max_bytes):
+                self._entries.popitem(last=False)
+
+            if self._entries and (available := available_memory()) is not None and available < self.min_available:
+                self._entries.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,8 +1,14 @@
 from collections.abc import Mapping
 from dataclasses import dataclass
 
+import numpy as np
+import numpy.typing as npt
 
-__all__ = ["Material", "get_shape", "get_category", "get_material"]
+
+__all__ = [
+    "Material", "get_shape", "get_category", "get_material",
+    "SHAPE_NAMES", "CATEGORY_NAMES", "shape_of", "category_of", "material_of", "unknown_types",
+]
 
 @dataclass(frozen=True, slots=True)
 class Material:
@@ -85,13 +91,82 @@ CATEGORIES: Mapping[str, tuple[int, ...]] = {
 }
 
 
+SHAPE_NAMES = tuple(SHAPES)
+CATEGORY_NAMES = tuple(CATEGORIES)
+
+_NUM_TYPES = max(max(indices) for indices in (*SHAPES.values(), *CATEGORIES.values())) + 1
+
+
+def _table(groups: Mapping[str, tuple[int, ...]], default: int = -1) -> npt.NDArray[np.int8]:
+    # filled in reverse so the first group listing an index wins, like the old linear scan
+    table = np.full(_NUM_TYPES, default, dtype=np.int8)
+    for group, indices in reversed([*enumerate(groups.values())]):
+        table[list(indices)] = group
+    table.flags.writeable = False
+    return table
+
+
+# unlisted types are treated as cubes, but still flagged as unknown
+_KNOWN_TYPES = _table(CATEGORIES) >= 0
+_SHAPE_TABLE = _table(SHAPES, default=SHAPE_NAMES.index("Cube"))
+_CATEGORY_TABLE = _table(CATEGORIES)
+
+_MATERIAL_TABLE = np.array(
+    [(m.index, m.name, m.color) for m in MATERIALS],
+    dtype=[("index", np.int8), ("name", "U16"), ("color", "U7")],
+)
+_MATERIAL_TABLE.flags.writeable = False
+
+
+def _lookup(table: npt.NDArray[np.int8], types: npt.ArrayLike, default: int = -1) -> npt.NDArray[np.int8]:
+    types = np.asarray(types, dtype=np.int64)
+    valid = (types >= 0) & (types < len(table))
+    result = np.full(types.shape, default, dtype=np.int8)
+    result[valid] = table[types[valid]]
+    return result
+
+
+def unknown_types(types: npt.ArrayLike) -> npt.NDArray[np.bool_]:
+    types = np.asarray(types, dtype=np.int64)
+    valid = (types >= 0) & (types < _NUM_TYPES)
+    unknown = ~valid
+    unknown[valid] = ~_KNOWN_TYPES[types[valid]]
+    return unknown
+
+
+def shape_of(types: npt.ArrayLike) -> npt.NDArray[np.int8]:
+    # index into SHAPE_NAMES, unknown types are cubes (see unknown_types)
+    return _lookup(_SHAPE_TABLE, types, default=SHAPE_NAMES.index("Cube"))
+
+
+def category_of(types: npt.ArrayLike) -> npt.NDArray[np.int8]:
+    # index into CATEGORY_NAMES, -1 for unknown types
+    return _lookup(_CATEGORY_TABLE, types)
+
+
+def material_of(materials: npt.ArrayLike) -> npt.NDArray[np.void]:
+    # material records, index -1 for unknown materials
+    materials = np.asarray(materials, dtype=np.int64)
+    valid = (materials >= 0) & (materials < len(_MATERIAL_TABLE))
+    result = np.zeros(materials.shape, dtype=_MATERIAL_TABLE.dtype)
+    result["index"] = -1
+    result[valid] = _MATERIAL_TABLE[materials[valid]]
+    return result
+
+
 def get_shape(index: int) -> str:
-    return next((key for key, indices in SHAPES.items() if index in indices), "Cube")
+    if 0 <= index < _NUM_TYPES:
+        return SHAPE_NAMES[_SHAPE_TABLE[index]]
+    return "Cube"
 
 
 def get_category(index: int) -> str:
-    return next((key for key, indices in CATEGORIES.items() if index in indices))
+    if 0 <= index < _NUM_TYPES and (category := _CATEGORY_TABLE[index]) >= 0:
+        return CATEGORY_NAMES[category]
+    raise KeyError(f"Unknown block type: {index}")
 
 
 def get_material(index: int) -> Material:
-    return next((m for m in MATERIALS if index == m.index))
+    if 0 <= index < len(MATERIALS):
+        return MATERIALS[index]
+    raise KeyError(f"Unknown material: {index}")
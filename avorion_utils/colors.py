@@ -0,0 +1,75 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+
+__all__ = ["parse_colors", "pack_colors", "unpack_colors", "palette", "face_colors", "PaletteAtlas", "palette_atlas"]
+
+
+def parse_colors(colors: Iterable[str]) -> npt.NDArray[np.uint32]:
+    # avorion stores colors as hex 'AARRGGBB'
+    return np.fromiter((int(c, 16) for c in colors), np.uint32)
+
+
+def unpack_colors(colors: npt.ArrayLike) -> npt.NDArray[np.uint8]:
+    # packed ARGB -> RGBA bytes
+    argb = np.asarray(colors, dtype=np.uint32).astype(">u4").view(np.uint8).reshape(-1, 4)
+    return np.roll(argb, -1, axis=1)
+
+
+def pack_colors(rgba: npt.ArrayLike) -> npt.NDArray[np.uint32]:
+    # RGBA bytes -> packed ARGB
+    argb = np.roll(np.asarray(rgba, dtype=np.uint8).reshape(-1, 4), 1, axis=1)
+    return np.ascontiguousarray(argb).view(">u4").reshape(-1).astype(np.uint32)
+
+
+def palette(colors: npt.ArrayLike) -> tuple[npt.NDArray[np.uint8], npt.NDArray[np.uint8] | npt.NDArray[np.uint16]]:
+    unique, index = np.unique(np.asarray(colors, dtype=np.uint32), return_inverse=True)
+    dtype = np.uint8 if len(unique) <= 256 else np.uint16
+    return unpack_colors(unique), index.reshape(-1).astype(dtype)
+
+
+def face_colors(
+    colors: npt.ArrayLike,
+    face_block: npt.NDArray[np.int64],
+    offsets: npt.NDArray[np.int64] | None = None,
+) -> npt.NDArray[np.float32]:
+    # float RGBA per face (or per corner if offsets are given), expanded from the uint8 palette
+    rgba, index = palette(colors)
+    values = (rgba.astype(np.float32) / 255)[index[face_block]]
+
+    if offsets is not None:
+        values = np.repeat(values, offsets, axis=0)
+
+    return values
+
+
+@dataclass(frozen=True, slots=True)
+class PaletteAtlas:
+    # RGBA texels, bottom row first, power of two sized
+    # every pair owns a column of two texels: the primary color and the secondary color above it
+    pixels: npt.NDArray[np.uint8]
+    # uv of the primary texel centre of every pair, the secondary is one texel row higher
+    texels: npt.NDArray[np.float32]
+    # pair of every input face
+    index: npt.NDArray[np.int64]
+
+
+def palette_atlas(primary: npt.ArrayLike, secondary: npt.ArrayLike) -> PaletteAtlas:
+    pairs = np.asarray(primary, dtype=np.uint64) << np.uint64(32) | np.asarray(secondary, dtype=np.uint64)
+    unique, index = np.unique(pairs, return_inverse=True)
+
+    n = max(1, len(unique))
+    width = 1 << int(np.ceil(np.log2(np.sqrt(n))))
+    height = 1 << int(np.ceil(np.log2(2 * -(-n // width))))
+
+    k = np.arange(len(unique))
+    x, y = k % width, 2 * (k // width)
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[y, x] = unpack_colors((unique >> np.uint64(32)).astype(np.uint32))
+    pixels[y + 1, x] = unpack_colors((unique & np.uint64(0xFFFFFFFF)).astype(np.uint32))
+
+    texels = np.column_stack([(x + 0.5) / width, (y + 0.5) / height]).astype(np.float32)
+    return PaletteAtlas(pixels, texels, index.reshape(-1))
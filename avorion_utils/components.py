@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from .parser import BlockColumns
+from .validation import TOLERANCE, _box_pairs
+
+
+__all__ = ["Components", "touching_pairs", "connected_components", "find_components"]
+
+
+@dataclass(frozen=True, slots=True)
+class Components:
+    # component of every block, 0 is the largest
+    labels: npt.NDArray[np.int64]
+    sizes: npt.NDArray[np.int64]
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+
+def touching_pairs(
+    lower: npt.NDArray[np.float64],
+    upper: npt.NDArray[np.float64],
+    tolerance: float = TOLERANCE,
+) -> npt.NDArray[np.int64]:
+    # boxes sharing a face: they meet within tolerance on every axis and overlap on at least two
+    # blocks touching at an edge or a corner only are not connected
+    lower, upper = lower.T.copy(), upper.T.copy()
+    pairs = [np.zeros((0, 2), dtype=np.int64)]
+    for i, j in _box_pairs(lower.T, upper.T, tolerance):
+        overlaps = np.zeros(len(i), dtype=np.int8)
+        for axis in range(3):
+            gap = np.minimum(upper[axis][i], upper[axis][j]) - np.maximum(lower[axis][i], lower[axis][j])
+            meet = gap >= -tolerance
+            i, j, overlaps = i[meet], j[meet], overlaps[meet] + (gap[meet] > tolerance)
+        pairs.append(np.stack([i[overlaps >= 2], j[overlaps >= 2]], axis=1))
+    return np.concatenate(pairs)
+
+
+def connected_components(n: int, pairs: npt.NDArray[np.int64]) -> Components:
+    # vectorized union-find: every root hooks onto the smallest root it is paired with,
+    # then pointer jumping flattens the trees, a few rounds even for long chains
+    parent = np.arange(n)
+    i, j = pairs[:, 0], pairs[:, 1]
+
+    while True:
+        ri, rj = parent[i], parent[j]
+        differ = ri != rj
+        if not differ.any():
+            break
+        np.minimum.at(parent, np.maximum(ri, rj)[differ], np.minimum(ri, rj)[differ])
+        while not np.array_equal(grand := parent[parent], parent):
+            parent = grand
+
+    roots, labels = np.unique(parent, return_inverse=True)
+    sizes = np.bincount(labels.reshape(-1), minlength=len(roots))
+
+    # largest component first, ties by smallest block
+    order = np.argsort(-sizes, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return Components(rank[labels.reshape(-1)], sizes[order])
+
+
+def find_components(blocks: BlockColumns, tolerance: float = TOLERANCE) -> Components:
+    # non-finite or inverted boxes touch nothing, each is a component of its own
+    valid = np.all(np.isfinite(blocks.lower) & np.isfinite(blocks.upper) & (blocks.lower <= blocks.upper), axis=1)
+    boxes = np.flatnonzero(valid)
+    pairs = boxes[touching_pairs(blocks.lower[boxes], blocks.upper[boxes], tolerance)]
+    return connected_components(len(blocks), pairs)
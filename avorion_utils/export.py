@@ -0,0 +1,232 @@
+"""Blender-free export of designs to glTF 2.0 binary and Wavefront OBJ.
+
+    python -m avorion_utils.export ship.xml ship.glb
+"""
+import argparse
+import json
+import struct
+from collections.abc import Sequence
+from dataclasses import replace
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+from .colors import unpack_colors
+from .geometry import Geometry
+from .parser import Block, BlockColumns, Ship, Turret
+
+
+__all__ = ["triangulate", "face_normals", "design_geometry", "write_glb", "write_obj", "export"]
+
+
+_GLB_MAGIC = 0x46546C67
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+
+_ARRAY_BUFFER = 34962
+_ELEMENT_ARRAY_BUFFER = 34963
+_FLOAT = 5126
+_UNSIGNED_INT = 5125
+
+
+def _face_starts(geometry: Geometry) -> npt.NDArray[np.int64]:
+    return np.cumsum(geometry.offsets) - geometry.offsets
+
+
+def triangulate(geometry: Geometry) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    # fan triangulation of the convex faces, returns corner indices (m, 3) and the face of every triangle
+    count = geometry.offsets - 2
+    tri_face = np.repeat(np.arange(len(geometry.offsets)), count)
+    # position of every triangle inside its fan
+    k = np.arange(len(tri_face)) - np.repeat(np.cumsum(count) - count, count)
+
+    first = _face_starts(geometry)[tri_face]
+    triangles = np.stack([first, first + k + 1, first + k + 2], axis=1)
+
+    return triangles, tri_face
+
+
+def face_normals(geometry: Geometry) -> npt.NDArray[np.float64]:
+    # newell's method, sums the edge cross products of every face
+    starts = _face_starts(geometry)
+    corners = np.arange(len(geometry.faces))
+    following = corners + 1
+    following[np.cumsum(geometry.offsets) - 1] = starts
+
+    v = geometry.vertices[geometry.faces]
+    normals = np.add.reduceat(np.cross(v, v[following]), starts, axis=0) if len(starts) else np.zeros((0, 3))
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+
+    return normals / np.where(length > 0, length, 1)
+
+
+def design_geometry(blocks: Sequence[Block]) -> tuple[Geometry, npt.NDArray[np.uint32]]:
+    # merged geometry of the blocks and the packed primary color of every face
+    columns = BlockColumns.from_blocks(blocks)
+    geometry, num_faces = Geometry.concatenate(Geometry.from_block(block) for block in blocks)
+    return geometry, columns.color[np.repeat(np.arange(len(blocks)), num_faces)]
+
+
+def _srgb_to_linear(c: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+
+def _write_padded(f: BinaryIO, data: memoryview | bytes, pad: bytes = b"\0") -> int:
+    f.write(data)
+    padding = -len(data) % 4
+    f.write(pad * padding)
+    return len(data) + padding
+
+
+def write_glb(
+    filepath: str | Path,
+    geometry: Geometry,
+    colors: npt.NDArray[np.uint32] | None = None,
+    name: str = "",
+) -> None:
+    # flat shaded: every face corner is its own vertex, carrying the face normal and color
+    triangles, _ = triangulate(geometry)
+
+    positions = np.ascontiguousarray(geometry.vertices[geometry.faces], dtype=np.float32)
+    normals = np.repeat(face_normals(geometry).astype(np.float32), geometry.offsets, axis=0)
+    indices = np.ascontiguousarray(triangles, dtype=np.uint32)
+
+    arrays = [("POSITION", positions), ("NORMAL", normals)]
+    if colors is not None:
+        rgba = unpack_colors(colors).astype(np.float32) / 255
+        rgba[:, :3] = _srgb_to_linear(rgba[:, :3])
+        arrays.append(("COLOR_0", np.repeat(rgba, geometry.offsets, axis=0)))
+
+    views, accessors, attributes, offset = [], [], {}, 0
+    for attribute, array in arrays + [("indices", indices)]:
+        accessor = {
+            "bufferView": len(views),
+            "componentType": _UNSIGNED_INT if array.dtype == np.uint32 else _FLOAT,
+            "count": array.size if attribute == "indices" else len(array),
+            "type": "SCALAR" if attribute == "indices" else f"VEC{array.shape[1]}",
+        }
+        if attribute == "POSITION" and len(array):
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+
+        views.append({
+            "buffer": 0,
+            "byteOffset": offset,
+            "byteLength": array.nbytes,
+            "target": _ELEMENT_ARRAY_BUFFER if attribute == "indices" else _ARRAY_BUFFER,
+        })
+        attributes[attribute] = len(accessors)
+        accessors.append(accessor)
+        offset += array.nbytes + -array.nbytes % 4
+
+    indices_accessor = attributes.pop("indices")
+    document = {
+        "asset": {"version": "2.0", "generator": "avorion_utils"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"name": name, "mesh": 0}],
+        "meshes": [{"name": name, "primitives": [{"attributes": attributes, "indices": indices_accessor, "material": 0}]}],
+        "materials": [{"name": "Avorion", "pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 0.5}}],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": views,
+        "accessors": accessors,
+    }
+    text = json.dumps(document, separators=(",", ":")).encode()
+
+    json_length = len(text) + -len(text) % 4
+    total = 12 + 8 + json_length + 8 + offset
+
+    with open(filepath, "wb") as f:
+        f.write(struct.pack("<III", _GLB_MAGIC, 2, total))
+        f.write(struct.pack("<II", json_length, _CHUNK_JSON))
+        _write_padded(f, text, b" ")
+        f.write(struct.pack("<II", offset, _CHUNK_BIN))
+        # straight from the array buffers, no intermediate bytes objects
+        for _, array in arrays + [("indices", indices)]:
+            _write_padded(f, memoryview(array).cast("B"))
+
+
+def write_obj(
+    filepath: str | Path,
+    geometry: Geometry,
+    colors: npt.NDArray[np.uint32] | None = None,
+    name: str = "",
+) -> None:
+    # polygons are written as they are, per-face colors become one material per unique color in a .mtl next to it
+    filepath = Path(filepath)
+    starts = _face_starts(geometry)
+
+    if colors is not None:
+        unique, face_color = np.unique(colors, return_inverse=True)
+        face_color = face_color.reshape(-1)
+    else:
+        unique, face_color = np.zeros(0, np.uint32), np.zeros(len(geometry.offsets), np.int64)
+
+    with open(filepath, "w") as f:
+        if len(unique):
+            f.write(f"mtllib {filepath.with_suffix('.mtl').name}\n")
+        f.write(f"o {name or filepath.stem}\n")
+        np.savetxt(f, geometry.vertices, fmt="v %.6f %.6f %.6f")
+        f.write("s off\n")
+
+        # one block of faces per (color, corner count), each written in a single savetxt call
+        order = np.lexsort((geometry.offsets, face_color))
+        keys = np.stack([face_color[order], geometry.offsets[order]], axis=1)
+        bounds = np.flatnonzero(np.any(np.diff(keys, axis=0), axis=1)) + 1
+
+        material = -1
+        for group in np.split(order, bounds) if len(order) else []:
+            if len(unique) and face_color[group[0]] != material:
+                material = face_color[group[0]]
+                f.write(f"usemtl color_{unique[material]:08x}\n")
+
+            n = geometry.offsets[group[0]]
+            corners = starts[group][:, None] + np.arange(n)
+            np.savetxt(f, geometry.faces[corners] + 1, fmt="f" + " %d" * n)
+
+    if len(unique):
+        rgb = unpack_colors(unique)[:, :3] / 255
+        with open(filepath.with_suffix(".mtl"), "w") as f:
+            for color, (r, g, b) in zip(unique, rgb):
+                f.write(f"newmtl color_{color:08x}\nKd {r:.6f} {g:.6f} {b:.6f}\n\n")
+
+
+def export(filepath: str | Path, geometry: Geometry, colors: npt.NDArray[np.uint32] | None = None, name: str = "") -> None:
+    match Path(filepath).suffix.lower():
+        case ".glb":
+            write_glb(filepath, geometry, colors, name)
+        case ".obj":
+            write_obj(filepath, geometry, colors, name)
+        case suffix:
+            raise ValueError(f"Unsupported format: {suffix}")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert an Avorion design to .glb or .obj without Blender.")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    args = parser.parse_args(argv)
+
+    root = ElementTree.parse(args.input).getroot()
+    if root.tag == "turret_design":
+        # parts are modelled around their origin, coaxial designs are only their base like in the importer
+        design = Turret.from_xml(root, args.input.stem)
+        selected = (design.base,) if design.coaxial else (design.base, design.body, design.barrel)
+        parts = [(design_geometry(part.blocks), part.origin) for part in selected]
+        geometry, _ = Geometry.concatenate(replace(g, vertices=g.vertices + origin) for (g, _), origin in parts)
+        colors = np.concatenate([c for (_, c), _ in parts])
+    else:
+        geometry, colors = design_geometry(Ship.from_xml(root, args.input.stem).blocks)
+
+    export(args.output, geometry, colors, args.input.stem)
+
+
+if __name__ == "__main__":
+    main()
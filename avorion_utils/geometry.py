@@ -8,7 +8,7 @@ import numpy.typing as npt
 from .categories import get_shape
 from .parser import Block
 
-__all__ = ["Geometry"]
+__all__ = ["Geometry", "mount_matrix"]
 
 
 def _rotation(o: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
@@ -36,12 +36,28 @@ def _rotate(vertices: npt.NDArray[np.float64], R: npt.NDArray[np.float64]) -> np
 def _transform(vertices: npt.NDArray[np.float64], scale: npt.NDArray[np.float64], translation: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
     return np.einsum("...i,i->...i", vertices, scale) + translation
 
+def mount_matrix(block: Block) -> npt.NDArray[np.float64]:
+    # place on the center of the block face pointing along the block's up axis
+    R = _rotation(block.orientation)
+    extent = block.upper - block.lower
+    up = R[:, 1]
+
+    M = np.eye(4)
+    M[:3, :3] = R
+    M[:3, 3] = (block.lower + block.upper) / 2 + up * abs(up @ extent) / 2
+    return M
+
+
 @dataclass(frozen=True, slots=True)
 class Geometry:
     vertices: npt.NDArray[np.float64]
     faces: npt.NDArray[np.int64]
     offsets: npt.NDArray[np.int64]
 
+    @property
+    def nbytes(self) -> int:
+        return self.vertices.nbytes + self.faces.nbytes + self.offsets.nbytes
+
     @classmethod
     def concatenate(cls, geometries: Iterable[Self]) -> tuple[Self, Sequence[int]]:
         vertices = []
@@ -53,8 +69,7 @@ class Geometry:
         vertex_offset = 0
         for geo in geometries:
             vertices.append(geo.vertices)
-            faces.append(geo.faces)
-            faces[-1] += vertex_offset
+            faces.append(geo.faces + vertex_offset)
             offsets.append(geo.offsets)
 
             num_faces.append(len(geo.offsets))
@@ -68,9 +83,19 @@ class Geometry:
 
         return new, num_faces
 
+    def select(self, mask: npt.NDArray[np.bool_]) -> Self:
+        # keep faces in mask, drop unreferenced vertices and reindex
+        corners = np.repeat(mask, self.offsets)
+        used, faces = np.unique(self.faces[corners], return_inverse=True)
+
+        return type(self)(
+            vertices=self.vertices[used],
+            faces=faces.reshape(-1).astype(np.int64),
+            offsets=self.offsets[mask],
+        )
 
     @classmethod
-    def from_block(cls, block: Block) -> Self:
+    def reference(cls, shape: str) -> Self:
         factories = {
             "Cube": cls.hexahedron,
             "Edge": cls.wedge,
@@ -82,7 +107,11 @@ class Geometry:
             "Twisted Corner 2": cls.tetrahedron_3,
         }
 
-        ref = factories[get_shape(block.type)]()
+        return factories[shape]()
+
+    @classmethod
+    def from_block(cls, block: Block) -> Self:
+        ref = cls.reference(get_shape(block.type))
         v = _rotate(ref.vertices, _rotation(block.orientation))
         v = _transform(v, block.upper - block.lower, block.lower)
         return replace(ref, vertices=v)
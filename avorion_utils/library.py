@@ -0,0 +1,261 @@
+import sqlite3
+import struct
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+from .colors import parse_colors, unpack_colors
+
+
+__all__ = ["DesignInfo", "Library", "scan", "render_preview", "encode_png", "decode_png"]
+
+
+SCHEMA_VERSION = 1
+PREVIEW_SIZE = 64
+
+
+@dataclass(frozen=True, slots=True)
+class DesignInfo:
+    path: str
+    name: str
+    root: str
+    mtime: float
+    size: int
+    blocks: int
+    turrets: int
+    lower: tuple[float, float, float]
+    upper: tuple[float, float, float]
+    preview: bytes = field(default=b"", repr=False)
+
+    @property
+    def dimensions(self) -> tuple[float, float, float]:
+        return tuple(u - l for l, u in zip(self.lower, self.upper))
+
+
+def encode_png(pixels: npt.NDArray[np.uint8]) -> bytes:
+    # 8 bit RGBA, filter type 0 on every row
+    height, width, _ = pixels.shape
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    rows = np.hstack([np.zeros((height, 1), np.uint8), pixels.reshape(height, -1)])
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(rows.tobytes(), 9)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def decode_png(data: bytes) -> npt.NDArray[np.uint8]:
+    # only what encode_png writes
+    width, height = struct.unpack(">II", data[16:24])
+
+    idat, pos = b"", 8
+    while pos < len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        if tag == b"IDAT":
+            idat += data[pos + 8:pos + 8 + length]
+        pos += length + 12
+
+    rows = np.frombuffer(zlib.decompress(idat), np.uint8).reshape(height, width * 4 + 1)
+    if rows[:, 0].any():
+        raise ValueError("Unsupported PNG filter.")
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+def render_preview(
+    lower: npt.NDArray[np.float64],
+    upper: npt.NDArray[np.float64],
+    colors: npt.NDArray[np.uint32],
+    size: int = PREVIEW_SIZE,
+) -> npt.NDArray[np.uint8]:
+    # top down (x right, z up), topmost block wins, shaded by height
+    pixels = np.zeros((size, size, 4), np.uint8)
+    if not len(lower):
+        return pixels
+
+    lo, hi = lower.min(axis=0), upper.max(axis=0)
+    extent = max(hi[0] - lo[0], hi[2] - lo[2], 1e-6)
+    scale = (size - 1) / extent
+    # center the shorter axis
+    pad = ((size - 1) - (hi[[0, 2]] - lo[[0, 2]]) * scale) / 2
+
+    x0 = np.floor((lower[:, 0] - lo[0]) * scale + pad[0]).astype(np.int64)
+    x1 = np.maximum(np.ceil((upper[:, 0] - lo[0]) * scale + pad[0]).astype(np.int64), x0 + 1)
+    z0 = np.floor((lower[:, 2] - lo[2]) * scale + pad[1]).astype(np.int64)
+    z1 = np.maximum(np.ceil((upper[:, 2] - lo[2]) * scale + pad[1]).astype(np.int64), z0 + 1)
+
+    height = (upper[:, 1] - lo[1]) / max(hi[1] - lo[1], 1e-6)
+    rgba = unpack_colors(colors).astype(np.float64)
+    rgba[:, :3] *= (0.4 + 0.6 * height)[:, None]
+    rgba[:, 3] = 255
+    rgba = rgba.astype(np.uint8)
+
+    for i in np.argsort(upper[:, 1], kind="stable"):
+        pixels[size - z1[i]:size - z0[i], x0[i]:x1[i]] = rgba[i]
+
+    return pixels
+
+
+def scan(path: str | Path, preview_size: int = PREVIEW_SIZE) -> DesignInfo:
+    # streaming pass, elements are dropped as soon as they are read
+    path = Path(path)
+    stat = path.stat()
+
+    root, turrets, depth_in_turret = "", 0, 0
+    bounds: list[list[float]] = []
+    colors: list[str] = []
+    # open elements, finished items are detached from their parent, not just emptied
+    open_elements = []
+
+    context = ElementTree.iterparse(path, events=("start", "end"))
+    for event, elem in context:
+        if event == "start":
+            if not root:
+                root = elem.tag
+            elif elem.tag == "turretDesign":
+                turrets += 1
+                depth_in_turret += 1
+            open_elements.append(elem)
+            continue
+
+        open_elements.pop()
+        if elem.tag == "block" and not depth_in_turret:
+            a = elem.attrib
+            bounds.append([float(a["lx"]), float(a["ly"]), float(a["lz"]), float(a["ux"]), float(a["uy"]), float(a["uz"])])
+            colors.append(a.get("color", "ffffffff"))
+        elif elem.tag == "turretDesign" or (elem.tag == "item" and not depth_in_turret):
+            depth_in_turret -= elem.tag == "turretDesign"
+            # every earlier sibling is finished as well, the parent (the root or <plan>) keeps no children
+            elem.clear()
+            if open_elements:
+                open_elements[-1].clear()
+
+    if root not in ("ship_design", "turret_design", "plan"):
+        raise ValueError(f"Not an Avorion design: {path}")
+
+    columns = np.asarray(bounds, dtype=np.float64).reshape(-1, 6)
+    lower, upper = columns[:, :3], columns[:, 3:]
+    preview = render_preview(lower, upper, parse_colors(colors), preview_size)
+
+    return DesignInfo(
+        path=str(path),
+        name=path.stem,
+        root=root,
+        mtime=stat.st_mtime,
+        size=stat.st_size,
+        blocks=len(columns),
+        turrets=turrets,
+        lower=tuple(lower.min(axis=0).tolist()) if len(columns) else (0.0, 0.0, 0.0),
+        upper=tuple(upper.max(axis=0).tolist()) if len(columns) else (0.0, 0.0, 0.0),
+        preview=encode_png(preview),
+    )
+
+
+class Library:
+    _COLUMNS = "path, name, root, mtime, size, blocks, turrets, lx, ly, lz, ux, uy, uz"
+
+    def __init__(self, database: str | Path) -> None:
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(database))
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(f"""
+                DROP TABLE IF EXISTS designs;
+                CREATE TABLE designs (
+                    path TEXT PRIMARY KEY, name TEXT, root TEXT, mtime REAL, size INTEGER,
+                    blocks INTEGER, turrets INTEGER,
+                    lx REAL, ly REAL, lz REAL, ux REAL, uy REAL, uz REAL,
+                    preview BLOB
+                );
+                CREATE INDEX designs_name ON designs (name);
+                CREATE INDEX designs_blocks ON designs (blocks);
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def update(self, folder: str | Path, pattern: str = "*.xml") -> tuple[int, int, list[tuple[str, str]]]:
+        # rescans only files whose mtime or size changed, returns (scanned, removed, failures)
+        known = {path: (mtime, size) for path, mtime, size in self.connection.execute("SELECT path, mtime, size FROM designs")}
+        found, scanned, failures = set(), 0, []
+
+        for path in Path(folder).glob(pattern):
+            key = str(path)
+            found.add(key)
+
+            stat = path.stat()
+            if known.get(key) == (stat.st_mtime, stat.st_size):
+                continue
+
+            try:
+                info = scan(path)
+            except (ElementTree.ParseError, ValueError, KeyError, OSError) as e:
+                failures.append((key, str(e)))
+                continue
+
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO designs ({self._COLUMNS}, preview) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (info.path, info.name, info.root, info.mtime, info.size, info.blocks, info.turrets,
+                 *info.lower, *info.upper, info.preview),
+            )
+            scanned += 1
+
+        removed = [(path,) for path in known.keys() - found if Path(path).parent == Path(folder)]
+        self.connection.executemany("DELETE FROM designs WHERE path = ?", removed)
+        self.connection.commit()
+
+        return scanned, len(removed), failures
+
+    def query(
+        self,
+        name: str = "",
+        root: str | None = None,
+        min_blocks: int = 0,
+        max_blocks: int | None = None,
+        order: str = "name",
+    ) -> Iterator[DesignInfo]:
+        # metadata only, previews are fetched separately
+        if order not in ("name", "blocks", "mtime", "turrets"):
+            raise ValueError(f"Invalid order: {order}")
+
+        where, args = ["blocks >= ?"], [min_blocks]
+        if name:
+            where.append("name LIKE ?")
+            args.append(f"%{name}%")
+        if root:
+            where.append("root = ?")
+            args.append(root)
+        if max_blocks is not None:
+            where.append("blocks <= ?")
+            args.append(max_blocks)
+
+        rows = self.connection.execute(
+            f"SELECT {self._COLUMNS} FROM designs WHERE {' AND '.join(where)} ORDER BY {order}", args
+        )
+        for path, name, root, mtime, size, blocks, turrets, lx, ly, lz, ux, uy, uz in rows:
+            yield DesignInfo(path, name, root, mtime, size, blocks, turrets, (lx, ly, lz), (ux, uy, uz))
+
+    def preview(self, path: str) -> npt.NDArray[np.uint8] | None:
+        row = self.connection.execute("SELECT preview FROM designs WHERE path = ?", (path,)).fetchone()
+        return decode_png(row[0]) if row and row[0] else None
@@ -0,0 +1,143 @@
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from .categories import SHAPE_NAMES, shape_of
+from .geometry import Geometry
+
+
+__all__ = [
+    "MemoryBudgetError", "MemoryEstimate", "MemoryTracker", "NO_MEMORY",
+    "available_memory", "estimate_import", "mesh_bytes",
+]
+
+
+# measured with tracemalloc on synthetic designs (python 3.11, numpy 1.26)
+BLOCK_BYTES = 600
+GEOMETRY_OVERHEAD_BYTES = 450
+# Mesh + Object datablocks and their CustomData headers
+OBJECT_BYTES = 4096
+# one float2 per corner, plus its float64 temporaries
+UV_BYTES = 8 + 48
+
+# vertices, faces, corners of every shape, in SHAPE_NAMES order
+_SHAPE_SIZES = np.array(
+    [(len(g.vertices), len(g.offsets), len(g.faces)) for g in map(Geometry.reference, SHAPE_NAMES)],
+    dtype=np.int64,
+)
+
+
+class MemoryBudgetError(MemoryError):
+    pass
+
+
+def available_memory() -> int | None:
+    # physical memory the system can hand out without swapping, None where unknown
+    if sys.platform == "win32":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("length", ctypes.c_ulong), ("load", ctypes.c_ulong)] + \
+                [(name, ctypes.c_ulonglong) for name in ("total", "available", "total_page", "available_page",
+                                                        "total_virtual", "available_virtual", "extended")]
+
+        status = MemoryStatus(length=ctypes.sizeof(MemoryStatus))
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.available
+        return None
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def mesh_bytes(vertices: int, faces: int, corners: int, color_domain: str = 'FACE') -> int:
+    # blender buffers: positions, corner verts and edges, face offsets and sharp flags, ~corners/2 edges
+    # plus two byte colors and seven int face attributes, and the numpy temporaries handed to foreach_set
+    colors = 2 * 4 * (corners if color_domain == 'CORNER' else faces)
+    blender = 12 * vertices + 8 * corners + 4 * corners + 5 * faces + colors + 7 * 4 * faces
+    temporaries = 8 * faces + 4 * colors
+    return blender + temporaries
+
+
+@dataclass(frozen=True, slots=True)
+class MemoryEstimate:
+    blocks: int
+    geometry: int
+    mesh: int
+    objects: int
+
+    @property
+    def total(self) -> int:
+        return self.blocks + self.geometry + self.mesh + self.objects
+
+    def __str__(self) -> str:
+        mib = 1 << 20
+        return (f"{self.total / mib:.1f} MiB (blocks {self.blocks / mib:.1f}, geometry {self.geometry / mib:.1f}, "
+                f"mesh {self.mesh / mib:.1f}, objects {self.objects / mib:.1f})")
+
+
+def estimate_import(types: npt.ArrayLike, seperate_blocks: bool = False, color_domain: str = 'FACE') -> MemoryEstimate:
+    # pre-flight estimate from the block types alone, before any Block or Geometry exists
+    types = np.asarray(types, dtype=np.int64)
+    vertices, faces, corners = _SHAPE_SIZES[shape_of(types)].sum(axis=0) if len(types) else (0, 0, 0)
+    data = 8 * (3 * vertices + faces + corners)
+
+    if seperate_blocks:
+        # one geometry alive at a time, but one datablock per block
+        geometry = GEOMETRY_OVERHEAD_BYTES + int(_SHAPE_SIZES.max(axis=0) @ [24, 8, 8])
+        objects = OBJECT_BYTES * len(types)
+    else:
+        # per-block geometries and their concatenation coexist
+        geometry = GEOMETRY_OVERHEAD_BYTES * len(types) + 2 * data
+        objects = OBJECT_BYTES
+
+    return MemoryEstimate(
+        blocks=BLOCK_BYTES * len(types),
+        geometry=int(geometry),
+        mesh=mesh_bytes(int(vertices), int(faces), int(corners), color_domain),
+        objects=int(objects),
+    )
+
+
+class MemoryTracker:
+    __slots__ = ("enabled", "current", "peak", "sizes", "estimate", "warnings")
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.current = 0
+        self.peak = 0
+        self.sizes: dict[str, int] = {}
+        self.estimate: MemoryEstimate | None = None
+        self.warnings: list[str] = []
+
+    def allocate(self, name: str, nbytes: int) -> None:
+        if self.enabled:
+            self.sizes[name] = self.sizes.get(name, 0) + nbytes
+            self.current += nbytes
+            self.peak = max(self.peak, self.current)
+
+    def free(self, name: str) -> None:
+        if self.enabled:
+            self.current -= self.sizes.pop(name, 0)
+
+    def summary(self) -> str:
+        text = f"peak memory {self.peak / (1 << 20):.1f} MiB"
+        if self.estimate is not None:
+            text += f", estimated {self.estimate}"
+        return text
+
+
+NO_MEMORY = MemoryTracker(enabled=False)
@@ -0,0 +1,118 @@
+import numpy as np
+import numpy.typing as npt
+
+from .categories import CATEGORY_NAMES, SHAPE_NAMES, category_of, shape_of
+from .parser import BlockColumns
+
+
+__all__ = ["find_interior"]
+
+
+# upper bound of the occupancy grid, the cell size grows until it fits
+MAX_CELLS = 1 << 23
+# see-through blocks never hide what is behind them
+TRANSPARENT = ("Glass", "Hologram", "Scaffold")
+
+
+def _propagate(exterior: npt.NDArray[np.bool_], empty: npt.NDArray[np.bool_], axis: int) -> npt.NDArray[np.bool_]:
+    # every run of empty cells along the axis that touches the exterior becomes exterior
+    shape = np.moveaxis(empty, axis, -1).shape
+    length = shape[-1]
+    e = np.moveaxis(exterior, axis, -1).reshape(-1, length)
+    m = np.moveaxis(empty, axis, -1).reshape(-1, length)
+
+    # occupied cells start a new run, runs are numbered globally over all lines
+    run = np.cumsum(~m, axis=1) + np.arange(len(m))[:, None] * (length + 1)
+    reached = np.zeros(len(m) * (length + 1), dtype=np.bool_)
+    reached[run[e]] = True
+
+    return np.moveaxis((m & reached[run]).reshape(shape), -1, axis)
+
+
+def _box_sums(table: npt.NDArray[np.int64], a: npt.NDArray[np.int64], b: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    # sum over the cells [a, b) of every box, table is the zero padded summed volume table
+    total = np.zeros(len(a), dtype=np.int64)
+    for corner in range(8):
+        pick = [(corner >> axis) & 1 for axis in range(3)]
+        index = tuple(np.where(pick[axis], b[:, axis], a[:, axis]) for axis in range(3))
+        total += (-1) ** (3 - sum(pick)) * table[index]
+    return total
+
+
+def find_interior(
+    blocks: BlockColumns,
+    resolution: float | None = None,
+    max_cells: int = MAX_CELLS,
+) -> npt.NDArray[np.bool_]:
+    # blocks the exterior never reaches, only opaque cubes occlude
+    # bounds snap to the nearest cell boundary, so touching blocks leave no gaps, gaps below half a cell close
+    # broken boxes neither occlude nor span the grid, they always count as visible
+    valid = np.all(np.isfinite(blocks.lower) & np.isfinite(blocks.upper) & (blocks.lower <= blocks.upper), axis=1)
+    interior = np.zeros(len(blocks), dtype=np.bool_)
+    if not valid.any():
+        return interior
+    blocks = blocks[valid]
+
+    extent = blocks.upper.max(axis=0) - blocks.lower.min(axis=0)
+    # half the thinnest block is fine enough, the grid limit only kicks in for large designs
+    thinnest = float((blocks.upper - blocks.lower).min())
+    r = resolution or max(float(np.cbrt(np.prod(extent + 1) / max_cells)), thinnest / 2)
+    while np.prod(np.ceil(extent / r) + 3) > max_cells:
+        r *= 1.25
+
+    # one empty cell of padding on every side, the flood starts there
+    origin = blocks.lower.min(axis=0) - r
+    shape = tuple(np.ceil((blocks.upper.max(axis=0) + r - origin) / r).astype(np.int64) + 1)
+
+    lower = (blocks.lower - origin) / r
+    upper = (blocks.upper - origin) / r
+
+    solid = shape_of(blocks.type) == SHAPE_NAMES.index("Cube")
+    solid &= ~np.isin(category_of(blocks.type), [CATEGORY_NAMES.index(c) for c in TRANSPARENT])
+
+    # rasterize the occluders with a 3d difference array
+    a = np.round(lower[solid]).astype(np.int64)
+    b = np.round(upper[solid]).astype(np.int64)
+    covers = np.all(b > a, axis=1)
+    a, b = a[covers], b[covers]
+
+    counts = np.zeros(tuple(s + 1 for s in shape), dtype=np.int32)
+    for corner in range(8):
+        pick = [(corner >> axis) & 1 for axis in range(3)]
+        index = tuple(np.where(pick[axis], b[:, axis], a[:, axis]) for axis in range(3))
+        np.add.at(counts, index, (-1) ** sum(pick))
+    for axis in range(3):
+        np.cumsum(counts, axis=axis, out=counts)
+    empty = counts[:-1, :-1, :-1] == 0
+    del counts
+
+    exterior = np.zeros(shape, dtype=np.bool_)
+    for axis in range(3):
+        np.moveaxis(exterior, axis, 0)[[0, -1]] = True
+    exterior &= empty
+
+    # sweep along the axes until no run of empty cells changes
+    while True:
+        reached = exterior.sum()
+        for axis in range(3):
+            exterior = _propagate(exterior, empty, axis)
+        if exterior.sum() == reached:
+            break
+
+    # a block is visible if an exterior cell touches any cell it overlaps
+    visible = exterior.copy()
+    for axis in range(3):
+        view, moved = np.moveaxis(visible, axis, 0), np.moveaxis(exterior, axis, 0)
+        view[1:] |= moved[:-1]
+        view[:-1] |= moved[1:]
+
+    table = np.zeros(tuple(s + 1 for s in shape), dtype=np.int64)
+    table[1:, 1:, 1:] = visible
+    for axis in range(3):
+        np.cumsum(table, axis=axis, out=table)
+
+    a = np.round(lower).astype(np.int64)
+    b = np.maximum(np.round(upper).astype(np.int64), a + 1)
+
+    interior[valid] = _box_sums(table, a, b) == 0
+    return interior
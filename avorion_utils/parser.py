@@ -1,5 +1,6 @@
-from collections.abc import Sequence
-from dataclasses import dataclass, field
+import hashlib
+from collections.abc import Callable, Collection, Iterable, Sequence
+from dataclasses import dataclass, field, fields
 from typing import Self, Literal
 
 import numpy as np
@@ -10,8 +11,10 @@ try:
 except ImportError:
     from xml.etree.ElementTree import Element
 
+from .categories import CATEGORY_NAMES, SHAPE_NAMES, category_of, shape_of
+from .colors import parse_colors
 
-__all__ = ["Block", "Ship", "Turret"]
+__all__ = ["Block", "BlockColumns", "BlockFilter", "Ship", "Turret"]
 
 
 def _parse_coordinate(elem: Element) -> npt.NDArray[np.float64]:
@@ -60,6 +63,165 @@ class Block:
         return self.lower, self.upper
 
 
+@dataclass(frozen=True, slots=True)
+class BlockColumns:
+    index: npt.NDArray[np.int64]
+    parent: npt.NDArray[np.int64]
+    lower: npt.NDArray[np.float64]
+    upper: npt.NDArray[np.float64]
+    orientation: npt.NDArray[np.int64]
+    type: npt.NDArray[np.int64]
+    material: npt.NDArray[np.int64]
+    color: npt.NDArray[np.uint32]
+    secondary_color: npt.NDArray[np.uint32]
+
+    @classmethod
+    def from_blocks(cls, blocks: Sequence[Block]) -> Self:
+        n = len(blocks)
+        return cls(
+            index=np.fromiter((b.index for b in blocks), np.int64, n),
+            parent=np.fromiter((b.parent for b in blocks), np.int64, n),
+            lower=np.array([b.lower for b in blocks], dtype=np.float64).reshape(n, 3),
+            upper=np.array([b.upper for b in blocks], dtype=np.float64).reshape(n, 3),
+            orientation=np.array([b.orientation for b in blocks], dtype=np.int64).reshape(n, 2),
+            type=np.fromiter((b.type for b in blocks), np.int64, n),
+            material=np.fromiter((b.material for b in blocks), np.int64, n),
+            color=parse_colors(b.color for b in blocks),
+            secondary_color=parse_colors(b.secondary_color for b in blocks),
+        )
+
+    @classmethod
+    def from_xml(cls, items: Iterable[Element]) -> Self:
+        # straight from <item> elements, no Block objects in between
+        pairs = [(item.attrib, block.attrib) for item in items if (block := item.find("block")) is not None]
+        n = len(pairs)
+
+        def column(keys: tuple[str, ...], dtype: type) -> npt.NDArray:
+            values = np.array([[block[k] for k in keys] for _, block in pairs], dtype=np.float64)
+            return values.astype(dtype).reshape(n, len(keys))
+
+        return cls(
+            index=np.fromiter((int(item.get("index", -1)) for item, _ in pairs), np.int64, n),
+            parent=np.fromiter((int(item.get("parent", -1)) for item, _ in pairs), np.int64, n),
+            lower=column(("lx", "ly", "lz"), np.float64),
+            upper=column(("ux", "uy", "uz"), np.float64),
+            orientation=column(("look", "up"), np.int64),
+            type=column(("index",), np.int64).reshape(n),
+            material=column(("material",), np.int64).reshape(n),
+            color=parse_colors(block.get("color", "ffffffff") for _, block in pairs),
+            secondary_color=parse_colors(block.get("secondaryColor", "00000000") for _, block in pairs),
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, key: slice | npt.NDArray[np.bool_] | npt.NDArray[np.int64]) -> Self:
+        return type(self)(**{f.name: getattr(self, f.name)[key] for f in fields(self)})
+
+
+@dataclass(frozen=True, slots=True)
+class BlockFilter:
+    lower: tuple[float, float, float] | None = None
+    upper: tuple[float, float, float] | None = None
+    subtree: int | None = None
+    # any collection is accepted and stored as a frozenset, filters are part of hashed cache keys
+    include_categories: Collection[str] = frozenset()
+    exclude_categories: Collection[str] = frozenset()
+    include_materials: Collection[int] = frozenset()
+    exclude_materials: Collection[int] = frozenset()
+    include_shapes: Collection[str] = frozenset()
+    exclude_shapes: Collection[str] = frozenset()
+
+    def __post_init__(self) -> None:
+        for name in ("lower", "upper"):
+            if (value := getattr(self, name)) is not None:
+                object.__setattr__(self, name, tuple(float(v) for v in value))
+        for name in ("include_categories", "exclude_categories", "include_shapes", "exclude_shapes"):
+            object.__setattr__(self, name, frozenset(getattr(self, name)))
+        for name in ("include_materials", "exclude_materials"):
+            object.__setattr__(self, name, frozenset(int(m) for m in getattr(self, name)))
+
+        for names, known in ((self.include_categories, CATEGORY_NAMES), (self.exclude_categories, CATEGORY_NAMES),
+                             (self.include_shapes, SHAPE_NAMES), (self.exclude_shapes, SHAPE_NAMES)):
+            if unknown := set(names) - set(known):
+                raise ValueError(f"Unknown names: {', '.join(sorted(unknown))}")
+
+    def _type_mask(self) -> npt.NDArray[np.bool_] | None:
+        # one lookup table over all known type ids, unknown ids only pass without category/shape filters
+        if not (self.include_categories or self.exclude_categories or self.include_shapes or self.exclude_shapes):
+            return None
+
+        types = np.arange(int(np.iinfo(np.int16).max))
+        categories, shapes = category_of(types), shape_of(types)
+        mask = np.ones(len(types), dtype=np.bool_)
+
+        if self.include_categories:
+            mask &= np.isin(categories, [CATEGORY_NAMES.index(c) for c in self.include_categories])
+        if self.exclude_categories:
+            mask &= ~np.isin(categories, [CATEGORY_NAMES.index(c) for c in self.exclude_categories])
+        if self.include_shapes:
+            mask &= np.isin(shapes, [SHAPE_NAMES.index(c) for c in self.include_shapes])
+        if self.exclude_shapes:
+            mask &= ~np.isin(shapes, [SHAPE_NAMES.index(c) for c in self.exclude_shapes])
+
+        return mask
+
+    def _subtree(self, items: Sequence[Element]) -> set[int]:
+        children: dict[int, list[int]] = {}
+        for item in items:
+            children.setdefault(int(item.get("parent", -1)), []).append(int(item.get("index", -1)))
+
+        result, stack = set(), [self.subtree]
+        while stack:
+            if (index := stack.pop()) not in result:
+                result.add(index)
+                stack.extend(children.get(index, ()))
+
+        return result
+
+    def predicate(self, items: Sequence[Element]) -> Callable[[Element], bool]:
+        # checks raw <item> attributes, rejected items never become a Block
+        type_mask = self._type_mask()
+        subtree = self._subtree(items) if self.subtree is not None else None
+        include_materials = set(self.include_materials)
+        exclude_materials = set(self.exclude_materials)
+        lower = self.lower if self.lower is not None else (-np.inf,) * 3
+        upper = self.upper if self.upper is not None else (np.inf,) * 3
+        box = self.lower is not None or self.upper is not None
+
+        def accepts(item: Element) -> bool:
+            if subtree is not None and int(item.get("index", -1)) not in subtree:
+                return False
+
+            if (block := item.find("block")) is None:
+                return True
+            attr = block.attrib
+
+            if type_mask is not None:
+                t = int(attr["index"])
+                if not (0 <= t < len(type_mask) and type_mask[t]):
+                    return False
+
+            if include_materials or exclude_materials:
+                m = int(attr["material"])
+                if (include_materials and m not in include_materials) or m in exclude_materials:
+                    return False
+
+            # keep every block touching the box
+            if box:
+                for axis, l, u in zip("xyz", lower, upper):
+                    if float(attr["u" + axis]) < l or float(attr["l" + axis]) > u:
+                        return False
+
+            return True
+
+        return accepts
+
+    def apply(self, items: Sequence[Element]) -> list[Element]:
+        accepts = self.predicate(items)
+        return [item for item in items if accepts(item)]
+
+
 @dataclass(frozen=True, slots=True)
 class TurretPart:
     part: Literal["barrel", "base", "body"] = "base"
@@ -116,24 +278,52 @@ class Turret:
             barrel=TurretPart.from_xml(barrel_xml),
         )
 
+    def digest(self) -> str:
+        # content hash of everything that ends up in the mesh or rig, ignores name and placement
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.asarray([self.size, self.coaxial], dtype=np.float64).tobytes())
+        for muzzle in self.muzzles:
+            h.update(np.asarray(muzzle, dtype=np.float64).tobytes())
+
+        for part in (self.base, self.body, self.barrel):
+            h.update(part.part.encode())
+            h.update(np.asarray(part.origin, dtype=np.float64).tobytes())
+            columns = BlockColumns.from_blocks(part.blocks)
+            for f in fields(columns):
+                h.update(getattr(columns, f.name).tobytes())
+
+        return h.hexdigest()
+
 @dataclass(frozen=True, slots=True)
 class Ship:
     name: str
     blocks: Sequence[Block] = field(default_factory=list, repr=False)
     turrets: Sequence[Turret] = field(default_factory=list, repr=False)
 
-    @classmethod
-    def from_xml(cls, ship_xml: Element, name: str = "") -> Self:
-        match ship_xml.tag:
+    @staticmethod
+    def item_path(tag: str) -> str:
+        match tag:
             case "ship_design":
-                tag = "plan/item"
+                return "plan/item"
             case "plan":
-                tag = "item"
+                return "item"
             case _:
-                raise ValueError(f"Invalid XML tag: {ship_xml.tag}")
+                raise ValueError(f"Invalid XML tag: {tag}")
+
+    @staticmethod
+    def mounted_turrets(ship_xml: Element, items: Iterable[Element]) -> list[Element]:
+        # turrets sit on a hull block, those whose block was filtered out or skipped have nowhere to go
+        indices = {int(item.get("index", -1)) for item in items}
+        return [t for t in ship_xml.iterfind("turretDesign") if int(t.get("blockIndex", -1)) in indices]
+
+    @classmethod
+    def from_xml(cls, ship_xml: Element, name: str = "", block_filter: BlockFilter | None = None) -> Self:
+        items = ship_xml.findall(cls.item_path(ship_xml.tag))
+        if block_filter is not None:
+            items = block_filter.apply(items)
 
         return cls(
             name=name,
-            blocks=[Block.from_xml(item) for item in ship_xml.iterfind(tag)],
-            turrets=[Turret.from_xml(turret) for turret in ship_xml.iterfind("turretDesign")],
+            blocks=[Block.from_xml(item) for item in items],
+            turrets=[Turret.from_xml(turret) for turret in cls.mounted_turrets(ship_xml, items)],
         )
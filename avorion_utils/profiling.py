@@ -0,0 +1,59 @@
+import json
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+
+
+__all__ = ["Timings", "NO_TIMINGS"]
+
+
+_NULL = nullcontext()
+
+
+class Timings:
+    __slots__ = ("enabled", "stages", "counts")
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.stages: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def stage(self, name: str) -> AbstractContextManager[None]:
+        # a shared no-op when disabled, so the hot path pays one attribute lookup
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, n: int) -> None:
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+    def summary(self) -> str:
+        counts = ", ".join(f"{n} {name}" for name, n in self.counts.items())
+        stages = ", ".join(f"{name} {t:.3f}s" for name, t in self.stages.items())
+        return f"{counts} in {self.total:.3f}s ({stages})"
+
+    def table(self) -> str:
+        width = max((len(name) for name in self.stages), default=0)
+        lines = [f"{name:<{width}}  {t:8.3f}s  {t / (self.total or 1):6.1%}" for name, t in self.stages.items()]
+        lines.extend(f"{name:<{width}}  {n:>9}" for name, n in self.counts.items())
+        return "\n".join(lines)
+
+    def dump(self, filepath: str, **extra: object) -> None:
+        with open(filepath, "w") as f:
+            json.dump(extra | {"total": self.total, "stages": self.stages, "counts": self.counts}, f, indent=2)
+
+
+NO_TIMINGS = Timings(enabled=False)
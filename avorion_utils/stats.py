@@ -0,0 +1,156 @@
+"""Block statistics of Avorion designs, without Blender.
+
+    python -m avorion_utils.stats ~/.avorion/ships
+    python -m avorion_utils.stats ~/.avorion/ships -f csv -o stats.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+from .categories import CATEGORY_NAMES, MATERIALS, SHAPE_NAMES, category_of, shape_of
+from .geometry import Geometry
+from .parser import BlockColumns, Ship
+
+
+__all__ = ["DesignStats", "SHAPE_VOLUMES", "DENSITY", "block_volumes", "design_stats", "read_columns"]
+
+
+def _unit_volume(geometry: Geometry) -> float:
+    # divergence theorem over the fan triangulated faces of a closed mesh
+    starts = np.cumsum(geometry.offsets) - geometry.offsets
+    v = geometry.vertices[geometry.faces].astype(np.float64)
+    volume = 0.0
+    for start, n in zip(starts, geometry.offsets):
+        a = v[start]
+        for k in range(1, n - 1):
+            volume += a @ np.cross(v[start + k], v[start + k + 1])
+    return volume / 6
+
+
+# exact volume of every shape in SHAPE_NAMES order, relative to its bounding box
+SHAPE_VOLUMES = np.array([_unit_volume(Geometry.reference(shape)) for shape in SHAPE_NAMES])
+
+# approximate mass per volume unit of each material tier, in MATERIALS order
+DENSITY = np.array([1.0, 0.9, 0.85, 0.8, 0.75, 0.7, 0.65])
+
+
+@dataclass(frozen=True, slots=True)
+class DesignStats:
+    name: str
+    blocks: int
+    volume: float
+    mass: float
+    lower: tuple[float, float, float]
+    upper: tuple[float, float, float]
+    categories: dict[str, int] = field(default_factory=dict)
+    material_volume: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def dimensions(self) -> tuple[float, float, float]:
+        return tuple(u - l for l, u in zip(self.lower, self.upper))
+
+    def to_dict(self) -> dict[str, object]:
+        return asdict(self)
+
+
+def block_volumes(blocks: BlockColumns) -> npt.NDArray[np.float64]:
+    return SHAPE_VOLUMES[shape_of(blocks.type)] * np.prod(blocks.upper - blocks.lower, axis=1)
+
+
+def design_stats(blocks: BlockColumns, name: str = "") -> DesignStats:
+    volumes = block_volumes(blocks)
+
+    # unknown categories and materials land in the trailing "Unknown" bin
+    categories = np.bincount(category_of(blocks.type) % (len(CATEGORY_NAMES) + 1), minlength=len(CATEGORY_NAMES) + 1)
+    material = np.where((blocks.material >= 0) & (blocks.material < len(MATERIALS)), blocks.material, len(MATERIALS))
+    material_volume = np.bincount(material, weights=volumes, minlength=len(MATERIALS) + 1)
+    density = np.append(DENSITY, DENSITY.mean())
+
+    names = [*CATEGORY_NAMES, "Unknown"]
+    materials = [*(m.name for m in MATERIALS), "Unknown"]
+    empty = not len(blocks)
+
+    return DesignStats(
+        name=name,
+        blocks=len(blocks),
+        volume=float(volumes.sum()),
+        mass=float(material_volume @ density),
+        lower=(0.0, 0.0, 0.0) if empty else tuple(blocks.lower.min(axis=0).tolist()),
+        upper=(0.0, 0.0, 0.0) if empty else tuple(blocks.upper.max(axis=0).tolist()),
+        categories={n: int(c) for n, c in zip(names, categories) if c},
+        material_volume={n: float(v) for n, v in zip(materials, material_volume) if v},
+    )
+
+
+def read_columns(path: str | Path) -> BlockColumns:
+    # hull blocks of ships and plans, all parts of a turret design
+    root = ElementTree.parse(path).getroot()
+    if root.tag == "turret_design":
+        return BlockColumns.from_xml(root.iter("item"))
+    return BlockColumns.from_xml(root.iterfind(Ship.item_path(root.tag)))
+
+
+def _rows(stats: Sequence[DesignStats]) -> list[dict[str, object]]:
+    rows = []
+    for s in stats:
+        row = {"name": s.name, "blocks": s.blocks, "volume": s.volume, "mass": s.mass}
+        row |= {f"size_{axis}": d for axis, d in zip("xyz", s.dimensions)}
+        row |= {f"blocks_{n}": s.categories.get(n, 0) for n in (*CATEGORY_NAMES, "Unknown")}
+        row |= {f"volume_{m.name}": s.material_volume.get(m.name, 0.0) for m in MATERIALS}
+        rows.append(row)
+    return rows
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Block statistics of every Avorion design in a folder.")
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("-p", "--pattern", default="*.xml")
+    parser.add_argument("-f", "--format", choices=("table", "json", "csv"), default="table")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="write to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    stats, failures = [], 0
+    for path in sorted(args.folder.glob(args.pattern)):
+        try:
+            stats.append(design_stats(read_columns(path), path.stem))
+        except (ElementTree.ParseError, ValueError, KeyError, OSError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failures += 1
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        match args.format:
+            case "json":
+                json.dump([s.to_dict() for s in stats], out, indent=2)
+            case "csv":
+                rows = _rows(stats)
+                writer = csv.DictWriter(out, fieldnames=list(rows[0]) if rows else ["name"])
+                writer.writeheader()
+                writer.writerows(rows)
+            case _:
+                width = max((len(s.name) for s in stats), default=4)
+                print(f"{'name':<{width}}  {'blocks':>8}  {'volume':>12}  {'mass':>12}  size", file=out)
+                for s in stats:
+                    size = " x ".join(f"{d:.1f}" for d in s.dimensions)
+                    print(f"{s.name:<{width}}  {s.blocks:>8}  {s.volume:>12.2f}  {s.mass:>12.2f}  {size}", file=out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from .categories import SHAPE_NAMES, shape_of
+from .geometry import Geometry, _rotate, _rotation
+from .parser import BlockColumns
+
+
+__all__ = ["Symmetry", "find_symmetry"]
+
+
+# coordinates are compared on a 1/1024 grid, so reflected floats still join
+_QUANTUM = 1024
+
+
+def _signature_tables() -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    # id of the unit cube geometry of every (shape, look * 6 + up), and of its reflection along each axis
+    # shapes with identical geometry share an id, e.g. a cube in any orientation
+    ids: dict[bytes, int] = {}
+
+    def signature(vertices: npt.NDArray[np.float64]) -> int:
+        rows = np.unique(np.round(vertices * 2).astype(np.int64), axis=0)
+        return ids.setdefault(rows.tobytes(), len(ids))
+
+    signatures = np.full((len(SHAPE_NAMES), 36), -1, dtype=np.int64)
+    mirrored = np.full((len(SHAPE_NAMES), 36, 3), -1, dtype=np.int64)
+
+    for s, shape in enumerate(SHAPE_NAMES):
+        reference = Geometry.reference(shape).vertices
+        for look, up in itertools.product(range(6), repeat=2):
+            if look // 2 == up // 2:
+                continue
+            vertices = _rotate(reference, _rotation(np.array([look, up])))
+            signatures[s, look * 6 + up] = signature(vertices)
+            for axis in range(3):
+                reflected = vertices.copy()
+                reflected[:, axis] = 1 - reflected[:, axis]
+                mirrored[s, look * 6 + up, axis] = signature(reflected)
+
+    return signatures, mirrored
+
+
+_SIGNATURES, _MIRRORED = _signature_tables()
+
+
+@dataclass(frozen=True, slots=True)
+class Symmetry:
+    axis: int
+    center: float
+    # blocks below the plane with a mirror partner above it
+    half: npt.NDArray[np.int64]
+    mirrored: npt.NDArray[np.int64]
+    # unmatched blocks and blocks mirroring onto themselves
+    rest: npt.NDArray[np.int64]
+
+    @property
+    def score(self) -> float:
+        total = len(self.half) + len(self.mirrored) + len(self.rest)
+        return 2 * len(self.half) / total if total else 0.0
+
+
+def _keys(signature: npt.NDArray[np.int64], lower: npt.NDArray[np.float64], upper: npt.NDArray[np.float64],
+          blocks: BlockColumns) -> npt.NDArray[np.int64]:
+    bounds = np.round(np.hstack([lower, upper]) * _QUANTUM).astype(np.int64)
+    return np.column_stack([signature, bounds, blocks.material, blocks.color, blocks.secondary_color])
+
+
+def _mirror(blocks: BlockColumns, axis: int) -> Symmetry:
+    # reflect every block across the plane through the bounds centre, then join reflections against the originals
+    n = len(blocks)
+    center = (blocks.lower[:, axis].min() + blocks.upper[:, axis].max()) / 2
+
+    shapes = shape_of(blocks.type)
+    orientation = blocks.orientation[:, 0] * 6 + blocks.orientation[:, 1]
+
+    lower, upper = blocks.lower.copy(), blocks.upper.copy()
+    lower[:, axis] = 2 * center - blocks.upper[:, axis]
+    upper[:, axis] = 2 * center - blocks.lower[:, axis]
+
+    keys = _keys(_SIGNATURES[shapes, orientation], blocks.lower, blocks.upper, blocks)
+    reflected = _keys(_MIRRORED[shapes, orientation, axis], lower, upper, blocks)
+
+    _, inverse = np.unique(np.vstack([keys, reflected]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    key_id, reflected_id = inverse[:n], inverse[n:]
+
+    # first block of every key, -1 where no block has it
+    first = np.full(inverse.max() + 1, -1, dtype=np.int64)
+    first[key_id[::-1]] = np.arange(n)[::-1]
+    partner = first[reflected_id]
+
+    index = np.arange(n)
+    paired = (partner >= 0) & (partner != index)
+    paired &= partner[np.where(paired, partner, 0)] == index
+
+    below = (blocks.lower[:, axis] + blocks.upper[:, axis]) / 2 < center
+    half = np.flatnonzero(paired & below)
+    mirrored = partner[half]
+
+    rest = np.ones(n, dtype=np.bool_)
+    rest[half] = rest[mirrored] = False
+
+    return Symmetry(axis, float(center), half, mirrored, np.flatnonzero(rest))
+
+
+def find_symmetry(blocks: BlockColumns, threshold: float = 0.5) -> Symmetry | None:
+    # best mirror plane over the three axes, None if it covers less than threshold of the blocks
+    if not len(blocks):
+        return None
+
+    best = max((_mirror(blocks, axis) for axis in range(3)), key=lambda s: s.score)
+    return best if best.score >= threshold else None
@@ -0,0 +1,81 @@
+import itertools
+
+import numpy as np
+
+try:
+    from xml.etree.cElementTree import Element, SubElement
+except ImportError:
+    from xml.etree.ElementTree import Element, SubElement
+
+from .categories import SHAPES, MATERIALS, unknown_types
+
+
+__all__ = ["ORIENTATIONS", "items", "plan", "ship_design", "turret_design"]
+
+
+# every valid (look, up) pair, look and up on different axes
+ORIENTATIONS = tuple((look, up) for look, up in itertools.product(range(6), repeat=2) if look // 2 != up // 2)
+
+_SIZES = (0.25, 0.5, 1.0, 1.5, 2.0)
+
+
+def items(parent: Element, n: int, seed: int = 0, offset: float = 0.0) -> Element:
+    # blocks on a grid, cycling through all shapes and orientations, so they never overlap
+    rng = np.random.default_rng(seed)
+    # type ids of a shape without a category would fail validation
+    shapes = [known for ids in SHAPES.values() if len(known := np.asarray(ids)[~unknown_types(ids)])]
+    spacing = max(_SIZES)
+    side = max(1, int(np.ceil(n ** (1 / 3))))
+
+    cells = np.stack(np.unravel_index(np.arange(n), (side, side, side)), axis=-1) * spacing + offset
+    sizes = rng.choice(_SIZES, size=(n, 3))
+    materials = rng.integers(0, len(MATERIALS), n)
+    colors = rng.integers(0, 16, (n, 2))
+
+    for i in range(n):
+        lower = cells[i]
+        upper = lower + sizes[i]
+        look, up = ORIENTATIONS[(i // len(shapes)) % len(ORIENTATIONS)]
+        indices = shapes[i % len(shapes)]
+
+        item = SubElement(parent, "item", index=str(i), parent=str(-1 if i == 0 else int(rng.integers(0, i))))
+        SubElement(item, "block", {
+            "lx": f"{lower[0]:g}", "ly": f"{lower[1]:g}", "lz": f"{lower[2]:g}",
+            "ux": f"{upper[0]:g}", "uy": f"{upper[1]:g}", "uz": f"{upper[2]:g}",
+            "index": str(indices[(i // len(shapes)) % len(indices)]),
+            "material": str(materials[i]),
+            "look": str(look),
+            "up": str(up),
+            # a small palette, like real designs
+            "color": f"ff{colors[i, 0] * 0x111111:06x}",
+            "secondaryColor": f"ff{colors[i, 1] * 0x0f0f0f:06x}",
+        })
+
+    return parent
+
+
+def turret_design(n: int = 30, seed: int = 0, tag: str = "turret_design", coaxial: bool = False, block_index: int = -1) -> Element:
+    turret = Element(tag, size="1.5", coaxial=str(coaxial).lower(), shot_color="4294901760", blockIndex=str(block_index))
+
+    for i, part in enumerate(("base", "body", "barrel")):
+        part_xml = SubElement(turret, part, px="0", py=f"{i * 0.5:g}", pz="0")
+        items(SubElement(part_xml, "plan"), max(1, n // 3), seed + i, offset=i * 4.0)
+
+    for x in (-0.25, 0.25):
+        SubElement(turret, "muzzlePosition", x=f"{x:g}", y="1", z="2")
+
+    return turret
+
+
+def plan(n: int, seed: int = 0) -> Element:
+    return items(Element("plan"), n, seed)
+
+
+def ship_design(n: int, seed: int = 0, turrets: int = 0, turret_designs: int = 1) -> Element:
+    ship = Element("ship_design")
+    items(SubElement(ship, "plan"), n, seed)
+
+    for i in range(turrets):
+        ship.append(turret_design(seed=seed + i % turret_designs, tag="turretDesign", block_index=i % max(n, 1)))
+
+    return ship
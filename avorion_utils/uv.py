@@ -0,0 +1,31 @@
+import numpy as np
+import numpy.typing as npt
+
+
+__all__ = ["box_uvs"]
+
+
+# uv axes of the faces looking along +x, -x, +y, -y, +z, -z, with z up
+# u is flipped on opposite sides so every face reads unmirrored from outside
+_U_AXIS = np.array([1, 1, 0, 0, 0, 0])
+_U_SIGN = np.array([1.0, -1.0, -1.0, 1.0, 1.0, -1.0])
+_V_AXIS = np.array([2, 2, 2, 2, 1, 1])
+
+
+def box_uvs(
+    positions: npt.NDArray[np.float64],
+    normals: npt.NDArray[np.float64],
+    offsets: npt.NDArray[np.int64],
+    density: float = 1.0,
+) -> npt.NDArray[np.float32]:
+    # triplanar box projection of every corner along the dominant axis of its face normal
+    # positions are per corner, uvs are the plane coordinates times density, so tiling is continuous across faces
+    axis = np.argmax(np.abs(normals), axis=1)
+    direction = 2 * axis + (normals[np.arange(len(normals)), axis] < 0)
+    direction = np.repeat(direction, offsets)
+
+    corners = np.arange(len(positions))
+    uvs = np.empty((len(positions), 2), dtype=np.float32)
+    uvs[:, 0] = _U_SIGN[direction] * positions[corners, _U_AXIS[direction]] * density
+    uvs[:, 1] = positions[corners, _V_AXIS[direction]] * density
+    return uvs
@@ -0,0 +1,284 @@
+"""Vectorized sanity checks of block columns, run before any geometry is built.
+
+    python -m avorion_utils.validation ship.xml plan.xml
+"""
+import argparse
+import sys
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import xml.etree.cElementTree as ElementTree
+    from xml.etree.cElementTree import Element
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+    from xml.etree.ElementTree import Element
+
+from .categories import MATERIALS, unknown_types
+from .parser import BlockColumns, Ship
+
+
+__all__ = ["ValidationError", "ValidationReport", "validate", "validate_xml", "find_overlaps"]
+
+
+# blocks touching within this distance do not overlap
+TOLERANCE = 1e-4
+# grid cells per box on average, coarser cells keep large plates from covering too many
+_CELLS_PER_BLOCK = 8
+# candidate pairs checked at once by the narrow phase
+_PAIR_CHUNK = 1 << 21
+# attributes Block.from_xml reads, integers and floats of <item> and <block>
+_ITEM_INTEGERS = ("index", "parent")
+_BLOCK_INTEGERS = ("look", "up", "index", "material")
+_BLOCK_FLOATS = ("lx", "ly", "lz", "ux", "uy", "uz")
+
+
+class ValidationError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class ValidationReport:
+    # positions into the validated columns, not block indices
+    blocks: BlockColumns = field(repr=False)
+    issues: dict[str, npt.NDArray[np.int64]] = field(default_factory=dict)
+    overlaps: npt.NDArray[np.int64] = field(default_factory=lambda: np.zeros((0, 2), np.int64))
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues and not len(self.overlaps)
+
+    def invalid(self) -> npt.NDArray[np.bool_]:
+        # blocks that would break geometry generation, overlaps alone do not
+        mask = np.zeros(len(self.blocks), dtype=np.bool_)
+        for name, positions in self.issues.items():
+            if name not in ("duplicate index", "missing parent"):
+                mask[positions] = True
+        return mask
+
+    def malformed(self) -> npt.NDArray[np.bool_]:
+        # items the parser rejects, they cannot be imported at all
+        mask = np.zeros(len(self.blocks), dtype=np.bool_)
+        mask[self.issues.get("malformed item", np.zeros(0, np.int64))] = True
+        return mask
+
+    def offending(self) -> npt.NDArray[np.int64]:
+        # block indices with any issue, overlaps included
+        positions = np.concatenate([*self.issues.values(), self.overlaps.reshape(-1), np.zeros(0, np.int64)])
+        return np.unique(self.blocks.index[positions])
+
+    def summary(self, limit: int = 5) -> str:
+        if self.ok:
+            return f"{len(self.blocks)} blocks, no issues"
+
+        def sample(positions: npt.NDArray[np.int64]) -> str:
+            indices = self.blocks.index[positions[:limit]].tolist()
+            return ", ".join(map(str, indices)) + (", ..." if len(positions) > limit else "")
+
+        lines = [f"{len(self.blocks)} blocks, {len(self.offending())} with issues"]
+        lines.extend(f"{name}: {len(positions)} ({sample(positions)})" for name, positions in self.issues.items())
+        if len(self.overlaps):
+            pairs = ", ".join(f"{a}/{b}" for a, b in self.blocks.index[self.overlaps[:limit]].tolist())
+            lines.append(f"overlaps: {len(self.overlaps)} ({pairs}{', ...' if len(self.overlaps) > limit else ''})")
+        return "\n".join(lines)
+
+
+def _box_pairs(
+    lower: npt.NDArray[np.float64],
+    upper: npt.NDArray[np.float64],
+    margin: float,
+) -> Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]]:
+    # candidate pairs of boxes grown by margin, in chunks: boxes are sorted into the cells of a uniform grid
+    # they cover and only boxes sharing a cell pair up, each pair once in the cell holding its intersection corner
+    # a single axis sweep degenerates on dense hulls, every slab of blocks would pair with itself
+    n = len(lower)
+    if n < 2:
+        return
+
+    cell = max(float(np.median((upper - lower).max(axis=1))), abs(margin), 1e-9)
+    while True:
+        a = np.floor(lower / cell).astype(np.int64)
+        b = np.maximum(np.floor((upper + margin) / cell).astype(np.int64), a)
+        counts = np.prod(b - a + 1, axis=1)
+        if counts.sum() <= _CELLS_PER_BLOCK * n:
+            break
+        cell *= 2
+
+    # one entry per covered cell, keyed by the linear index of the cell
+    dims = b - a + 1
+    a -= a.min(axis=0)
+    owner = np.repeat(np.arange(n), counts)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    d = dims[owner]
+    cells = a[owner] + np.column_stack([k % d[:, 0], k // d[:, 0] % d[:, 1], k // (d[:, 0] * d[:, 1])])
+    span = cells.max(axis=0) + 1
+    key = (cells[:, 0] * span[1] + cells[:, 1]) * span[2] + cells[:, 2]
+
+    order = np.argsort(key, kind="stable")
+    key, owner = key[order], owner[order]
+    # per axis columns, gathers from contiguous 1d arrays are several times faster
+    cells, a = cells[order].T.copy(), a.T.copy()
+
+    # candidates of an entry are the following entries of the same cell
+    end = np.searchsorted(key, key, side="right")
+    count = end - np.arange(len(key)) - 1
+    total = np.concatenate([[0], np.cumsum(count)])
+
+    start = 0
+    while start < len(key):
+        stop = min(len(key), max(start + 1, int(np.searchsorted(total, total[start] + _PAIR_CHUNK, side="right")) - 1))
+        c = count[start:stop]
+        p = np.repeat(np.arange(start, stop), c)
+        q = p + 1 + np.arange(len(p)) - np.repeat(np.cumsum(c) - c, c)
+        i, j = owner[p], owner[q]
+
+        # the cell of the intersection corner is the larger lower cell of the two boxes
+        for axis in range(3):
+            first = np.maximum(a[axis][i], a[axis][j]) == cells[axis][p]
+            i, j, p = i[first], j[first], p[first]
+        yield i, j
+        start = stop
+
+
+def find_overlaps(
+    lower: npt.NDArray[np.float64],
+    upper: npt.NDArray[np.float64],
+    tolerance: float = TOLERANCE,
+) -> npt.NDArray[np.int64]:
+    lower, upper = lower.T.copy(), upper.T.copy()
+    pairs = [np.zeros((0, 2), dtype=np.int64)]
+    for i, j in _box_pairs(lower.T, upper.T, -tolerance):
+        for axis in range(3):
+            hit = np.minimum(upper[axis][i], upper[axis][j]) - np.maximum(lower[axis][i], lower[axis][j]) > tolerance
+            i, j = i[hit], j[hit]
+        pairs.append(np.stack([i, j], axis=1))
+    return np.sort(np.concatenate(pairs), axis=1)
+
+
+def validate(
+    blocks: BlockColumns,
+    overlaps: bool = True,
+    parents: bool = True,
+    tolerance: float = TOLERANCE,
+) -> ValidationReport:
+    # parents: check that every parent exists, pointless once a filter dropped blocks
+    checks = {
+        "non-finite bounds": ~np.all(np.isfinite(blocks.lower) & np.isfinite(blocks.upper), axis=1),
+        "lower > upper": np.any(blocks.lower > blocks.upper, axis=1),
+        "empty volume": np.any(blocks.lower == blocks.upper, axis=1),
+        "invalid orientation": np.any((blocks.orientation < 0) | (blocks.orientation > 5), axis=1)
+                               | (blocks.orientation[:, 0] // 2 == blocks.orientation[:, 1] // 2),
+        "unknown type": unknown_types(blocks.type),
+        "unknown material": (blocks.material < 0) | (blocks.material >= len(MATERIALS)),
+    }
+
+    # every occurrence after the first of an index
+    _, first = np.unique(blocks.index, return_index=True)
+    duplicate = np.ones(len(blocks), dtype=np.bool_)
+    duplicate[first] = False
+    checks["duplicate index"] = duplicate
+    if parents:
+        checks["missing parent"] = (blocks.parent != -1) & ~np.isin(blocks.parent, blocks.index)
+
+    issues = {name: np.flatnonzero(mask) for name, mask in checks.items() if mask.any()}
+
+    pairs = np.zeros((0, 2), dtype=np.int64)
+    if overlaps:
+        # only well formed boxes take part in the broad phase
+        boxes = np.flatnonzero(~(checks["non-finite bounds"] | checks["lower > upper"]))
+        pairs = boxes[find_overlaps(blocks.lower[boxes], blocks.upper[boxes], tolerance)]
+
+    return ValidationReport(blocks, issues, pairs)
+
+
+def _malformed(item: Element) -> bool:
+    # everything Block.from_xml would raise on
+    if (block := item.find("block")) is None:
+        return True
+    try:
+        for key in _ITEM_INTEGERS:
+            int(item.attrib[key])
+        for key in _BLOCK_INTEGERS:
+            int(block.attrib[key])
+        for key in _BLOCK_FLOATS:
+            float(block.attrib[key])
+        int(block.attrib["color"], 16)
+        int(block.get("secondaryColor", "0"), 16)
+    except (KeyError, ValueError):
+        return True
+    return False
+
+
+def _index(item: Element) -> int:
+    try:
+        return int(item.get("index", -1))
+    except ValueError:
+        return -1
+
+
+def validate_xml(
+    items: Sequence[Element],
+    overlaps: bool = True,
+    parents: bool = True,
+    tolerance: float = TOLERANCE,
+) -> ValidationReport:
+    # validate straight from <item> elements, items with missing or unreadable attributes are reported as malformed
+    malformed = np.fromiter((_malformed(item) for item in items), np.bool_, len(items))
+    if not malformed.any():
+        return validate(BlockColumns.from_xml(items), overlaps, parents, tolerance)
+
+    good = np.flatnonzero(~malformed)
+    report = validate(BlockColumns.from_xml([items[i] for i in good]), overlaps, parents, tolerance)
+
+    # back to positions into items, malformed rows only carry their index
+    columns = {}
+    for f in fields(report.blocks):
+        values = getattr(report.blocks, f.name)
+        columns[f.name] = np.zeros((len(items), *values.shape[1:]), dtype=values.dtype)
+        columns[f.name][good] = values
+    columns["index"][malformed] = [_index(items[i]) for i in np.flatnonzero(malformed)]
+
+    issues = {"malformed item": np.flatnonzero(malformed)}
+    issues.update((name, good[positions]) for name, positions in report.issues.items())
+    return ValidationReport(BlockColumns(**columns), issues, good[report.overlaps])
+
+
+def _parts(root: Element) -> Iterator[tuple[str, list[Element]]]:
+    # turret parts number their blocks on their own, so each is validated separately
+    if root.tag != "turret_design":
+        yield "", root.findall(Ship.item_path(root.tag))
+        return
+
+    for part in ("base", "body", "barrel"):
+        if (part_xml := root.find(part)) is not None:
+            yield part, part_xml.findall("*/item")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check Avorion designs for broken blocks.")
+    parser.add_argument("files", nargs="+", type=Path)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in args.files:
+        try:
+            root = ElementTree.parse(path).getroot()
+            reports = [(part, validate_xml(items)) for part, items in _parts(root)]
+        except (ElementTree.ParseError, ValueError, OSError) as e:
+            print(f"{path}: {e}")
+            failed = True
+            continue
+
+        for part, report in reports:
+            print(f"{path}{f' {part}' if part else ''}: {report.summary()}")
+            failed |= not report.ok
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
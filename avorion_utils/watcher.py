@@ -0,0 +1,86 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+
+__all__ = ["FileWatcher", "file_digest"]
+
+
+def file_digest(path: str | Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass(slots=True)
+class _Watched:
+    stat: tuple[int, int] | None
+    digest: str
+    # when the stat last changed, None once the change has been handled
+    changed_at: float | None = None
+
+
+class FileWatcher:
+    # polling is a stat per file, the content is only hashed once a changed file stayed untouched for debounce seconds
+    # so a save written in several chunks, or a touch without new content, never reports a change
+    __slots__ = ("debounce", "_files")
+
+    def __init__(self, debounce: float = 0.5) -> None:
+        self.debounce = debounce
+        self._files: dict[str, _Watched] = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, path: str | Path) -> bool:
+        return os.path.realpath(path) in self._files
+
+    def paths(self) -> list[str]:
+        return list(self._files)
+
+    def watch(self, path: str | Path) -> str:
+        key = os.path.realpath(path)
+        self._files[key] = _Watched(_stat(key), file_digest(key))
+        return key
+
+    def unwatch(self, path: str | Path) -> None:
+        self._files.pop(os.path.realpath(path), None)
+
+    def clear(self) -> None:
+        self._files.clear()
+
+    def poll(self, now: float | None = None) -> list[str]:
+        # paths whose content changed since the last report
+        now = time.monotonic() if now is None else now
+        changed = []
+
+        for path, state in self._files.items():
+            stat = _stat(path)
+            if stat != state.stat:
+                state.stat, state.changed_at = stat, now
+                continue
+            if stat is None or state.changed_at is None or now - state.changed_at < self.debounce:
+                continue
+
+            state.changed_at = None
+            try:
+                digest = file_digest(path)
+            except OSError:
+                continue
+            if digest != state.digest:
+                state.digest = digest
+                changed.append(path)
+
+        return changed
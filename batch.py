@@ -0,0 +1,289 @@
+"""Headless batch conversion of Avorion designs.
+
+    blender --background --factory-startup --python batch.py -- "ships/*.xml" -f glb -o out -j 4
+
+The coordinator may also run in a plain python interpreter, it only needs
+Blender for the worker processes (see --blender).
+"""
+import argparse
+import glob
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+
+FORMATS = ("blend", "glb", "gltf", "obj", "fbx", "stl")
+
+_PACKAGE = "avorion_importer"
+
+
+def _argv() -> list[str]:
+    # blender passes script arguments after '--'
+    return sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="batch.py", description="Convert Avorion XML designs without a UI.")
+    parser.add_argument("inputs", nargs="*", help="input files or glob patterns")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="blend")
+    parser.add_argument("-o", "--output", default=".", help="output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("-s", "--summary", default=None, help="write a JSON summary to this file")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="blender executable for the workers")
+    parser.add_argument("--seperate-blocks", action="store_true")
+    parser.add_argument("--split", choices=("NONE", "CATEGORY", "MATERIAL", "COMPONENT"), default="NONE")
+    parser.add_argument("--system-blocks", choices=("INCLUDE", "HIDE", "EXCLUDE"), default="INCLUDE")
+    parser.add_argument("--interior-blocks", choices=("KEEP", "HIDE", "REMOVE"), default="KEEP")
+    parser.add_argument("--color-domain", choices=("FACE", "CORNER"), default="FACE")
+    parser.add_argument("--materials", choices=("NONE", "MATERIAL", "CATEGORY", "PALETTE"), default="MATERIAL")
+    parser.add_argument("--uv-density", type=float, default=0.0, help="texture repeats per unit, 0 for no uvs")
+    parser.add_argument("--validation", choices=("OFF", "WARN", "SKIP", "ABORT"), default="WARN")
+    parser.add_argument("--no-turrets", action="store_true")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    return parser
+
+
+def _digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _expand(patterns: list[str]) -> list[Path]:
+    paths = {}
+    for pattern in patterns:
+        for match in (glob.glob(pattern, recursive=True) or [pattern]):
+            path = Path(match).resolve()
+            paths.setdefault(path, None)
+    return [*paths]
+
+
+def _outputs(inputs: list[Path], output: Path, format: str) -> list[Path]:
+    # the input folders are mirrored below their common parent, so equal names from different folders never collide
+    # names still equal after that, e.g. ship.xml and ship.XML, are numbered
+    root = Path(os.path.commonpath([path.parent for path in inputs])) if inputs else output
+    used = set()
+    outputs = []
+    for path in inputs:
+        folder = output / path.parent.relative_to(root)
+        target = folder / f"{path.stem}.{format}"
+        n = 1
+        while str(target).casefold() in used:
+            target = folder / f"{path.stem}-{n}.{format}"
+            n += 1
+        used.add(str(target).casefold())
+        outputs.append(target)
+    return outputs
+
+
+def _import_addon():
+    # the addon directory is not necessarily a valid package name
+    if _PACKAGE not in sys.modules:
+        root = Path(__file__).resolve().parent
+        spec = importlib.util.spec_from_file_location(_PACKAGE, root / "__init__.py", submodule_search_locations=[str(root)])
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[_PACKAGE] = module
+        spec.loader.exec_module(module)
+
+    return importlib.import_module(f"{_PACKAGE}.import_avorion_xml")
+
+
+def _export(bpy, filepath: Path, format: str) -> None:
+    match format:
+        case "blend":
+            bpy.ops.wm.save_as_mainfile(filepath=str(filepath), copy=True)
+        case "glb":
+            bpy.ops.export_scene.gltf(filepath=str(filepath), export_format='GLB')
+        case "gltf":
+            bpy.ops.export_scene.gltf(filepath=str(filepath), export_format='GLTF_SEPARATE')
+        case "obj":
+            bpy.ops.wm.obj_export(filepath=str(filepath))
+        case "fbx":
+            bpy.ops.export_scene.fbx(filepath=str(filepath))
+        case "stl":
+            bpy.ops.wm.stl_export(filepath=str(filepath))
+
+
+def run_worker(manifest_path: str) -> int:
+    import bpy
+    from bpy_extras.io_utils import axis_conversion
+
+    importer = _import_addon()
+    Timings = importlib.import_module(f"{_PACKAGE}.avorion_utils.profiling").Timings
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    global_matrix = axis_conversion(from_forward='-Z', from_up='Y').to_4x4()
+    options = importer.ImportOptions(**manifest["options"], global_matrix=global_matrix, use_cache=False)
+    results = []
+
+    for task in manifest["tasks"]:
+        result = {"input": task["input"], "output": task["output"], "status": "ok", "seconds": {}}
+        try:
+            bpy.ops.wm.read_factory_settings(use_empty=True)
+
+            timings = Timings()
+            start = time.perf_counter()
+            importer.load(bpy.context, task["input"], options, timings)
+            result["seconds"]["import"] = time.perf_counter() - start
+            result["stages"] = timings.stages
+            result["counts"] = timings.counts
+
+            start = time.perf_counter()
+            Path(task["output"]).parent.mkdir(parents=True, exist_ok=True)
+            _export(bpy, Path(task["output"]), manifest["format"])
+            result["seconds"]["export"] = time.perf_counter() - start
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["traceback"] = traceback.format_exc()
+
+        results.append(result)
+
+        # written after every file so a crashing worker still reports what it finished
+        with open(manifest["result"], "w") as f:
+            json.dump(results, f)
+
+    return 0
+
+
+def _blender_binary(default: str) -> str:
+    try:
+        import bpy
+        return bpy.app.binary_path or default
+    except ImportError:
+        return default
+
+
+def run(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+
+    inputs = _expand(args.inputs)
+    output = Path(args.output).resolve()
+    files = []
+
+    # identical designs are converted once and copied
+    converted: dict[str, dict] = {}
+    duplicates = []
+    for path, target in zip(inputs, _outputs(inputs, output, args.format)):
+        entry = {"input": str(path), "output": str(target)}
+        if not path.is_file():
+            files.append(entry | {"status": "failed", "error": "file not found", "seconds": {}})
+            continue
+
+        key = _digest(path)
+        if key in converted:
+            duplicates.append((entry, converted[key]))
+        else:
+            converted[key] = entry
+
+    tasks = sorted(converted.values(), key=lambda t: os.path.getsize(t["input"]), reverse=True)
+    jobs = max(1, min(args.jobs, len(tasks)))
+
+    options = {
+        "seperate_blocks": args.seperate_blocks,
+        "split_mode": args.split,
+        "system_blocks": args.system_blocks,
+        "interior_blocks": args.interior_blocks,
+        "color_domain": args.color_domain,
+        "material_mode": args.materials,
+        "uv_density": args.uv_density,
+        "validation": args.validation,
+        "import_turrets": not args.no_turrets,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="avorion-batch-") as tmp:
+        workers = []
+        for i in range(jobs if tasks else 0):
+            manifest = {
+                "format": args.format,
+                "options": options,
+                # largest files first, dealt round robin
+                "tasks": tasks[i::jobs],
+                "result": os.path.join(tmp, f"result{i}.json"),
+            }
+            manifest_path = os.path.join(tmp, f"manifest{i}.json")
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f)
+
+            command = [
+                _blender_binary(args.blender), "--background", "--factory-startup",
+                "--python", str(Path(__file__).resolve()), "--", "--worker", manifest_path,
+            ]
+            try:
+                workers.append((manifest, subprocess.Popen(command, stdout=subprocess.DEVNULL)))
+            except OSError as e:
+                workers.append((manifest, e))
+
+        for manifest, process in workers:
+            if isinstance(process, subprocess.Popen):
+                error = f"worker exited with code {process.wait()}"
+            else:
+                error = f"failed to start worker: {process}"
+
+            results = []
+            if os.path.exists(manifest["result"]):
+                with open(manifest["result"]) as f:
+                    results = json.load(f)
+
+            done = {r["input"] for r in results}
+            files.extend(results)
+            files.extend(
+                task | {"status": "failed", "error": error, "seconds": {}}
+                for task in manifest["tasks"] if task["input"] not in done
+            )
+
+    status = {f["input"]: f for f in files}
+    for entry, original in duplicates:
+        result = status.get(original["input"], {})
+        if result.get("status") == "ok":
+            Path(entry["output"]).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(original["output"], entry["output"])
+            files.append(entry | {"status": "duplicate", "source": original["input"], "seconds": {}})
+        else:
+            files.append(entry | {"status": "failed", "error": f"duplicate of failed {original['input']}", "seconds": {}})
+
+    summary = {
+        "format": args.format,
+        "jobs": jobs,
+        "seconds": time.perf_counter() - start,
+        "converted": sum(f["status"] == "ok" for f in files),
+        "duplicates": sum(f["status"] == "duplicate" for f in files),
+        "failed": sum(f["status"] == "failed" for f in files),
+        "files": files,
+    }
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    print(f"converted {summary['converted']}, duplicates {summary['duplicates']}, failed {summary['failed']} "
+          f"in {summary['seconds']:.2f}s")
+
+    return 1 if summary["failed"] else 0
+
+
+def main() -> int:
+    args = _parser().parse_args(_argv())
+
+    if args.worker:
+        return run_worker(args.worker)
+
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Blender-free benchmarks of the import pipeline on synthetic designs.
+
+    python benchmarks/bench_pipeline.py -o results.json
+    python benchmarks/bench_pipeline.py -o new.json --compare results.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from avorion_utils import synthetic
+from avorion_utils.colors import face_colors
+from avorion_utils.geometry import Geometry
+from avorion_utils.parser import BlockColumns, Ship, Turret
+
+
+SCALES = (1_000, 10_000, 100_000, 500_000)
+
+
+def _time(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_design(root: str, blocks: int, repeat: int, seed: int = 0) -> dict[str, float | int]:
+    match root:
+        case "ship_design":
+            xml = ElementTree.tostring(synthetic.ship_design(blocks, seed, turrets=8, turret_designs=2))
+            parse = lambda: Ship.from_xml(ElementTree.fromstring(xml))
+        case "plan":
+            xml = ElementTree.tostring(synthetic.plan(blocks, seed))
+            parse = lambda: Ship.from_xml(ElementTree.fromstring(xml))
+        case "turret_design":
+            xml = ElementTree.tostring(synthetic.turret_design(blocks, seed))
+            parse = lambda: Turret.from_xml(ElementTree.fromstring(xml))
+        case _:
+            raise ValueError(root)
+
+    result: dict[str, float | int] = {"blocks": blocks, "xml_bytes": len(xml)}
+
+    result["parse"], design = _time(parse, repeat)
+    parsed = design.blocks if isinstance(design, Ship) else [*design.base.blocks, *design.body.blocks, *design.barrel.blocks]
+
+    result["columns"], columns = _time(lambda: BlockColumns.from_blocks(parsed), repeat)
+    result["geometry"], geometries = _time(lambda: [Geometry.from_block(b) for b in parsed], repeat)
+    result["concatenate"], (geometry, num_faces) = _time(lambda: Geometry.concatenate(g for g in geometries), repeat)
+
+    face_block = np.repeat(np.arange(len(parsed)), num_faces)
+    result["face_colors"], _ = _time(lambda: face_colors(columns.color, face_block), repeat)
+    result["corner_colors"], _ = _time(lambda: face_colors(columns.color, face_block, geometry.offsets), repeat)
+
+    result["vertices"] = len(geometry.vertices)
+    result["faces"] = len(geometry.offsets)
+    result["corners"] = len(geometry.faces)
+    return result
+
+
+def compare(new: dict, old: dict) -> None:
+    stages = ("parse", "columns", "geometry", "concatenate", "face_colors", "corner_colors")
+    baseline = {(r["root"], r["blocks"]): r for r in old["results"]}
+
+    print(f"{'root':<14}{'blocks':>8}" + "".join(f"{s:>15}" for s in stages))
+    for r in new["results"]:
+        if (b := baseline.get((r["root"], r["blocks"]))) is None:
+            continue
+        ratios = (r[s] / b[s] if b.get(s) else float("nan") for s in stages)
+        print(f"{r['root']:<14}{r['blocks']:>8}" + "".join(f"{x:>14.2f}x" for x in ratios))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("-r", "--roots", nargs="+", default=("ship_design", "plan", "turret_design"),
+                        choices=("ship_design", "plan", "turret_design"))
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="best of n runs")
+    parser.add_argument("-o", "--output", default=None, help="write results as JSON")
+    parser.add_argument("-c", "--compare", default=None, help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    results = []
+    for root in args.roots:
+        # turrets are small, no point in running them at ship scale
+        for blocks in (args.scales if root != "turret_design" else sorted({min(s, 1_000) for s in args.scales})):
+            result = {"root": root} | bench_design(root, blocks, args.repeat)
+            results.append(result)
+            print(f"{root:<14}{blocks:>8} blocks  parse {result['parse']:.3f}s  geometry {result['geometry']:.3f}s  "
+                  f"concatenate {result['concatenate']:.3f}s  colors {result['face_colors']:.4f}s", flush=True)
+
+    report = {
+        "commit": _commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 import itertools
 import math
-from collections.abc import Sequence, Iterator
-from typing import overload
+import queue
+import threading
+from collections.abc import Generator, Sequence, Iterator
+from dataclasses import dataclass, replace
+from typing import TypeVar, overload
 
 
 import bpy
@@ -17,52 +20,121 @@ except ImportError:
 
 from pathlib import Path
 
-from bpy.types import Armature, Collection, Context, Object, Mesh
+from bpy.types import Armature, Collection, Context, LayerCollection, Object, Mesh
 from mathutils import Matrix, Vector
 
-from .avorion_utils.parser import Ship, Turret, Block
-from .avorion_utils.geometry import Geometry
-from .avorion_utils.categories import get_shape, get_category, get_material
+from .avorion_utils.parser import Ship, Turret, Block, BlockColumns, BlockFilter
+from .avorion_utils.colors import face_colors, parse_colors, unpack_colors
+from .avorion_utils.geometry import Geometry, mount_matrix
+from .avorion_utils.cache import DesignCache
+from .avorion_utils.categories import CATEGORY_NAMES, category_of, material_of, shape_of
+from .avorion_utils.profiling import NO_TIMINGS, Timings
+from .avorion_utils.components import find_components
+from .avorion_utils.occlusion import find_interior
+from .avorion_utils.symmetry import find_symmetry
+from .avorion_utils.validation import ValidationError, validate_xml
+from .materials import assign_materials, assign_uvs
+from .avorion_utils.memory import (
+    BLOCK_BYTES, GEOMETRY_OVERHEAD_BYTES, OBJECT_BYTES, UV_BYTES, NO_MEMORY,
+    MemoryBudgetError, MemoryTracker, estimate_import, mesh_bytes,
+)
+
+T = TypeVar("T")
+
+# units of work between two steps of the time sliced import
+STEP_BLOCKS = 256
+STEP_BYTES = 1 << 20
+
+# parsed designs and their geometry, kept while Blender runs so redo skips parsing
+DESIGN_CACHE = DesignCache()
+
 
 def hex2rgba(color: str) -> tuple[float, float, float, float]:
-    # thing about a more elegant was to pass this arround
-    return tuple((np.roll(np.frombuffer(bytearray.fromhex(color), np.uint8, 4), -1) / 255).tolist())
+    return tuple((unpack_colors(parse_colors((color,)))[0] / 255).tolist())
+
+
+def _write_colors(
+    mesh: Mesh,
+    name: str,
+    colors: npt.NDArray[np.uint32],
+    face_block: npt.NDArray[np.int64],
+    offsets: npt.NDArray[np.int64],
+    domain: str,
+) -> None:
+    # colors stay uint8 palette indices per block, floats are only produced for foreach_set
+    if domain == 'CORNER':
+        values = face_colors(colors, face_block, offsets)
+        attr = mesh.color_attributes.get(name) or mesh.color_attributes.new(name, 'BYTE_COLOR', 'CORNER')
+    else:
+        values = face_colors(colors, face_block)
+        attr = mesh.attributes.get(name) or mesh.attributes.new(name, 'BYTE_COLOR', 'FACE')
+
+    attr.data.foreach_set("color_srgb", values.reshape(-1))
+
+
+def _write_block_attributes(
+    mesh: Mesh,
+    blocks: BlockColumns,
+    face_block: npt.NDArray[np.int64],
+    components: npt.NDArray[np.int64] | None = None,
+) -> None:
+    # keep block identity on merged meshes, category and shape index into CATEGORY_NAMES and SHAPE_NAMES
+    # component numbers the groups of touching blocks, 0 is the largest
+    attributes = {
+        "block_index": blocks.index,
+        "block_parent": blocks.parent,
+        "block_type": blocks.type,
+        "material": blocks.material,
+        "category": category_of(blocks.type),
+        "shape": shape_of(blocks.type),
+    }
+    if components is not None:
+        attributes["component"] = components
+
+    for name, values in attributes.items():
+        attr = mesh.attributes.get(name) or mesh.attributes.new(name, 'INT', 'FACE')
+        attr.data.foreach_set("value", values.astype(np.int32)[face_block])
 
 
 def generate_mesh(
     geometry: Geometry,
     name: str,
     origin: Vector | None,
-    colors: npt.ArrayLike | tuple[float, float, float, float],
-    secondary_colors: npt.ArrayLike | tuple[float, float, float, float],
+    blocks: BlockColumns,
+    face_block: npt.NDArray[np.int64],
+    color_domain: str = 'FACE',
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+    components: npt.NDArray[np.int64] | None = None,
 ) -> Object:
-    mesh = bpy.data.meshes.new(name)
-
-    mesh.vertices.add(len(geometry.vertices))
-    mesh.loops.add(int(np.sum(geometry.offsets)))
-    mesh.polygons.add(len(geometry.offsets))
+    timings.count("vertices", len(geometry.vertices))
+    timings.count("faces", len(geometry.offsets))
+    memory.allocate("mesh", mesh_bytes(len(geometry.vertices), len(geometry.offsets), len(geometry.faces), color_domain) + OBJECT_BYTES)
 
-    mesh.vertices.foreach_set("co", np.asarray(geometry.vertices).reshape(-1))
-    mesh.polygons.foreach_set("loop_total", geometry.offsets)
-    mesh.polygons.foreach_set("loop_start", np.cumsum(geometry.offsets)-geometry.offsets)
-    mesh.polygons.foreach_set("vertices", geometry.faces)
+    with timings.stage("foreach_set"):
+        mesh = bpy.data.meshes.new(name)
 
-    if isinstance(colors, tuple):
-        colors = np.asarray([colors] * len(geometry.offsets))
+        mesh.vertices.add(len(geometry.vertices))
+        mesh.loops.add(int(np.sum(geometry.offsets)))
+        mesh.polygons.add(len(geometry.offsets))
 
-    attr = mesh.color_attributes.get("Color") or mesh.color_attributes.new("Color", "BYTE_COLOR", "CORNER")
-    attr.data.foreach_set("color_srgb", np.repeat(colors, geometry.offsets, axis=0).reshape(-1))
+        mesh.vertices.foreach_set("co", np.asarray(geometry.vertices).reshape(-1))
+        mesh.polygons.foreach_set("loop_total", geometry.offsets)
+        mesh.polygons.foreach_set("loop_start", np.cumsum(geometry.offsets)-geometry.offsets)
+        mesh.polygons.foreach_set("vertices", geometry.faces)
 
-    if isinstance(secondary_colors, tuple):
-        secondary_colors = np.asarray([secondary_colors] * len(geometry.offsets), np.int8)
-    attr = mesh.color_attributes.get("Secondary Color") or mesh.color_attributes.new("Secondary Color", "BYTE_COLOR", "CORNER")
-    attr.data.foreach_set("color_srgb", np.repeat(secondary_colors, geometry.offsets, axis=0).reshape(-1))
+    with timings.stage("attributes"):
+        _write_colors(mesh, "Color", blocks.color, face_block, geometry.offsets, color_domain)
+        _write_colors(mesh, "Secondary Color", blocks.secondary_color, face_block, geometry.offsets, color_domain)
+        _write_block_attributes(mesh, blocks, face_block, components)
 
-    mesh.color_attributes.default_color_name = "Color"
-    mesh.color_attributes.active_color_name = "Color"
+        if color_domain == 'CORNER':
+            mesh.color_attributes.default_color_name = "Color"
+            mesh.color_attributes.active_color_name = "Color"
 
-    mesh.shade_flat()
-    mesh.update()
+    with timings.stage("shade_flat"):
+        mesh.shade_flat()
+        mesh.update()
 
     obj = bpy.data.objects.new(mesh.name, mesh)
 
@@ -71,36 +143,277 @@ def generate_mesh(
 
     return obj
 
+
+def _block_groups(blocks: BlockColumns, split: str, system_blocks: str,
+                  components: npt.NDArray[np.int64] | None = None) -> npt.NDArray[np.str_]:
+    match split:
+        case 'COMPONENT' if components is not None:
+            # zero padded, so the parts sort by size
+            width = len(str(components.max(initial=0)))
+            return np.char.add("part", np.char.zfill(components.astype(np.str_), width))
+        case 'CATEGORY':
+            # -1 (unknown type) picks the trailing label
+            return np.asarray([*CATEGORY_NAMES, "Unknown"])[category_of(blocks.type)]
+        case 'MATERIAL':
+            names = material_of(blocks.material)["name"]
+            return np.where(names != "", names, "Unknown")
+        case _:
+            if system_blocks == 'HIDE':
+                return np.where(category_of(blocks.type) == CATEGORY_NAMES.index("Systems"), "Systems", "")
+            return np.full(len(blocks), "")
+
+
+@dataclass(frozen=True, slots=True)
+class MeshData:
+    # everything generate_mesh needs, built without touching bpy
+    name: str
+    geometry: Geometry
+    blocks: BlockColumns
+    face_block: npt.NDArray[np.int64]
+    origin: tuple[float, float, float] | None = None
+    hidden: bool = False
+    # local axis of a mirror through the origin, -1 for none
+    mirror_axis: int = -1
+    # component of every block in blocks
+    components: npt.NDArray[np.int64] | None = None
+
+
+def mesh_data_steps(
+    blocks: Sequence[Block],
+    name: str = "",
+    origin: Vector | tuple[float, float, float] | None = None,
+    seperate_blocks: bool = False,
+    split: str = 'NONE',
+    system_blocks: str = 'INCLUDE',
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+    geometries: list[Geometry | None] | None = None,
+    symmetry: bool = False,
+    interior_blocks: str = 'KEEP',
+) -> Iterator[int | MeshData]:
+    # bpy free, safe to run off the main thread
+    # yields the number of blocks processed since the last step, or a finished mesh
+    # geometries: optional per-block cache aligned with blocks, missing entries are filled in
+    origin = tuple(origin) if origin is not None else None
+    source = np.arange(len(blocks))
+
+    with timings.stage("columns"):
+        columns = BlockColumns.from_blocks(blocks)
+
+        if system_blocks == 'EXCLUDE':
+            keep = category_of(columns.type) != CATEGORY_NAMES.index("Systems")
+            blocks = [block for block, k in zip(blocks, keep) if k]
+            source = source[keep]
+            columns = columns[keep]
+
+    interior = np.zeros(len(blocks), dtype=np.bool_)
+    if interior_blocks != 'KEEP':
+        with timings.stage("occlusion"):
+            interior = find_interior(columns)
+        timings.count("interior blocks", int(interior.sum()))
+
+        if interior_blocks == 'REMOVE':
+            blocks = [block for block, k in zip(blocks, ~interior) if k]
+            source = source[~interior]
+            columns = columns[~interior]
+            interior = interior[~interior]
+
+    # only splitting by component needs them, the attribute is written alongside
+    components = None
+    if split == 'COMPONENT':
+        with timings.stage("components"):
+            components = find_components(columns).labels
+        timings.count("components", int(components.max(initial=-1)) + 1)
+
+    def block_geometry(i: int) -> Geometry:
+        if geometries is None:
+            return Geometry.from_block(blocks[i])
+        if (geometry := geometries[source[i]]) is None:
+            geometry = geometries[source[i]] = Geometry.from_block(blocks[i])
+        return geometry
+
+    timings.count("blocks", len(blocks))
+
+    if seperate_blocks:
+        hidden = interior.copy()
+        if system_blocks == 'HIDE':
+            hidden |= category_of(columns.type) == CATEGORY_NAMES.index("Systems")
+
+        for start in range(0, len(blocks), STEP_BLOCKS):
+            for i, block in enumerate(blocks[start:start + STEP_BLOCKS], start):
+                with timings.stage("geometry"):
+                    geometry = block_geometry(i)
+                    face_block = np.zeros(len(geometry.offsets), np.int64)
+                yield MeshData(f"{name}.block{block.index}", geometry, columns[i:i+1], face_block, origin, bool(hidden[i]),
+                               components=components[i:i+1] if components is not None else None)
+            yield min(STEP_BLOCKS, len(blocks) - start)
+
+        return
+
+    symmetric = None
+    if symmetry and split == 'NONE' and system_blocks != 'HIDE' and interior_blocks != 'HIDE':
+        with timings.stage("symmetry"):
+            symmetric = find_symmetry(columns)
+
+    if symmetric is not None:
+        # geometry for one half plus a mirror, leftovers are meshed as they are
+        timings.count("mirrored blocks", len(symmetric.mirrored))
+        shift = np.zeros(3)
+        shift[symmetric.axis] = symmetric.center
+
+        for part_name, indices, mirror in ((name, symmetric.half, True), (f"{name}.asymmetric", symmetric.rest, False)):
+            parts = []
+            for start in range(0, len(indices), STEP_BLOCKS):
+                with timings.stage("geometry"):
+                    parts.extend(block_geometry(i) for i in indices[start:start + STEP_BLOCKS])
+                yield min(STEP_BLOCKS, len(indices) - start)
+
+            if not parts:
+                continue
+
+            with timings.stage("concatenate"):
+                geometry, num_faces = Geometry.concatenate(parts)
+                face_block = np.repeat(indices, num_faces)
+                memory.allocate("geometry", geometry.nbytes + face_block.nbytes)
+
+            if mirror:
+                # the mirror plane runs through the object origin
+                geometry = replace(geometry, vertices=geometry.vertices - shift)
+                part_origin = tuple((np.asarray(origin if origin is not None else (0.0, 0.0, 0.0)) + shift).tolist())
+                yield MeshData(part_name, geometry, columns, face_block, part_origin, mirror_axis=symmetric.axis,
+                               components=components)
+            else:
+                yield MeshData(part_name, geometry, columns, face_block, origin, components=components)
+
+        memory.free("geometry")
+        yield len(symmetric.mirrored)
+        return
+
+    parts = []
+    for start in range(0, len(blocks), STEP_BLOCKS):
+        with timings.stage("geometry"):
+            parts.extend(block_geometry(i) for i in range(start, min(start + STEP_BLOCKS, len(blocks))))
+        yield min(STEP_BLOCKS, len(blocks) - start)
+
+    memory.allocate("geometries", sum(g.nbytes for g in parts) + GEOMETRY_OVERHEAD_BYTES * len(parts))
+
+    with timings.stage("concatenate"):
+        geometry, num_faces = Geometry.concatenate(parts)
+        face_block = np.repeat(np.arange(len(blocks)), num_faces)
+        memory.allocate("geometry", geometry.nbytes + face_block.nbytes)
+        del parts
+        memory.free("geometries")
+
+    labels = _block_groups(columns, split, system_blocks, components)
+    if interior_blocks == 'HIDE':
+        labels = np.where(interior, "Interior", labels)
+
+    groups, block_group = np.unique(labels, return_inverse=True)
+    if len(groups) == 0 or (len(groups) == 1 and not groups[0]):
+        yield MeshData(name, geometry, columns, face_block, origin, components=components) # check if this is a problem ...
+        memory.free("geometry")
+        return
+
+    # partition the merged faces, one mask per group
+    face_group = block_group.reshape(-1)[face_block]
+
+    for index, group in enumerate(groups):
+        with timings.stage("split"):
+            mask = face_group == index
+            part = geometry.select(mask)
+        hidden = (group == "Systems" and system_blocks == 'HIDE') or (group == "Interior" and interior_blocks == 'HIDE')
+        yield MeshData(f"{name}.{group}" if group else name, part, columns, face_block[mask], origin, hidden,
+                       components=components)
+
+    memory.free("geometry")
+
+
+def realize_mesh(
+    data: MeshData,
+    color_domain: str = 'FACE',
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> Object:
+    origin = Vector(data.origin) if data.origin is not None else None
+    obj = generate_mesh(data.geometry, data.name, origin, data.blocks, data.face_block, color_domain, timings, memory,
+                        data.components)
+
+    if data.hidden:
+        obj.hide_viewport = obj.hide_render = True
+
+    if data.mirror_axis >= 0:
+        mirror = obj.modifiers.new("Mirror", 'MIRROR')
+        mirror.use_axis = [axis == data.mirror_axis for axis in range(3)]
+        mirror.use_mirror_merge = False
+
+    return obj
+
+
+def generate_steps(
+    blocks: Sequence[Block],
+    name: str = "",
+    origin: Vector | None = None,
+    seperate_blocks: bool = False,
+    split: str = 'NONE',
+    system_blocks: str = 'INCLUDE',
+    color_domain: str = 'FACE',
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+    geometries: list[Geometry | None] | None = None,
+    symmetry: bool = False,
+    interior_blocks: str = 'KEEP',
+) -> Generator[int, None, list[Object]]:
+    # yields the number of blocks processed since the last step, returns the objects
+    objects = []
+
+    for item in mesh_data_steps(blocks, name, origin, seperate_blocks, split, system_blocks, timings, memory, geometries,
+                                symmetry, interior_blocks):
+        if isinstance(item, MeshData):
+            objects.append(realize_mesh(item, color_domain, timings, memory))
+        else:
+            yield item
+
+    return objects
+
+
+def _drain(steps: Generator[object, None, T]) -> T:
+    while True:
+        try:
+            next(steps)
+        except StopIteration as e:
+            return e.value
+
+
 def generate_objects(
     blocks: Sequence[Block],
     name: str = "",
     origin: Vector | None = None,
-    seperate_blocks: bool = False
-) -> Iterator[Object]:
-    if seperate_blocks:
-        yield from (generate_mesh(Geometry.from_block(block), f"{name}.block{block.index}", origin, hex2rgba(block.color), hex2rgba(block.secondary_color)) for block in blocks)
-    else:
-        geometry, num_faces = Geometry.concatenate(Geometry.from_block(block) for block in blocks)
-        colors = [*itertools.chain.from_iterable([hex2rgba(block.color)] * faces for block, faces in zip(blocks, num_faces))]
-        secondary_colors = [*itertools.chain.from_iterable([hex2rgba(block.secondary_color)] * faces for block, faces in zip(blocks, num_faces))]
+    seperate_blocks: bool = False,
+    split: str = 'NONE',
+    system_blocks: str = 'INCLUDE',
+    color_domain: str = 'FACE',
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> list[Object]:
+    return _drain(generate_steps(blocks, name, origin, seperate_blocks, split, system_blocks, color_domain, timings, memory))
 
-        yield generate_mesh(geometry, name, origin, colors, secondary_colors) # check if this is a problem ...
 
+TURRET_BONES = ("base", "rotation", "elevation", "target")
 
-def create_turret_armature(context: Context, collection: Collection, design: Turret, name: str = "turret"):
-    _armature = bpy.data.armatures.new(f"{name}_armature")
-    armature = bpy.data.objects.new(_armature.name, _armature)
 
-    collection.objects.link(armature)
-    armature.select_set(True)
-    context.view_layer.objects.active = armature
+@dataclass(frozen=True, slots=True)
+class TurretRig:
+    collection: Collection
+    design: Turret
+    # base, body and barrel meshes, parented to the matching bones
+    objects: Sequence[Object]
+    global_matrix: Matrix
+    select: bool = True
 
-    bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-    bpy.ops.object.mode_set(mode='EDIT', toggle=False)
 
-    edit_bones = _armature.edit_bones
-    bones = (f"{armature.name}_base", f"{armature.name}_rotation",
-             f"{armature.name}_elevation", f"{armature.name}_target")
+def _add_turret_bones(armature: Object, design: Turret) -> tuple[str, ...]:
+    edit_bones = armature.data.edit_bones
+    bones = tuple(f"{armature.name}_{bone}" for bone in TURRET_BONES)
 
     base = edit_bones.new(bones[0])
     base.head = design.base.origin
@@ -124,17 +437,14 @@ def create_turret_armature(context: Context, collection: Collection, design: Tur
     elevation.parent = rotation
     target.parent = base
 
-    bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+    return bones
+
 
+def _add_turret_constraints(armature: Object, bones: tuple[str, ...]) -> None:
     assert armature.pose is not None
 
     pose_bones = armature.pose.bones
-    rotation = pose_bones.get(bones[1])
-    assert rotation is not None
-    elevation = pose_bones.get(bones[2])
-    assert elevation is not None
-    target = pose_bones.get(bones[3])
-    assert target is not None
+    rotation, elevation, target = (pose_bones[name] for name in bones[1:])
 
     c = rotation.constraints.new(type='LOCKED_TRACK')
     c.target = armature
@@ -169,20 +479,357 @@ def create_turret_armature(context: Context, collection: Collection, design: Tur
     c.target_space = 'LOCAL'
     c.use_x, c.use_y, c.use_z = True, False, False
 
-    return armature, bones
 
+def build_turret_rigs(context: Context, rigs: Sequence[TurretRig]) -> list[Object]:
+    # all armatures share one multi-object edit mode pass, constraints are added afterwards in object mode
+    if not rigs:
+        return []
 
+    armatures = []
+    for rig in rigs:
+        data = bpy.data.armatures.new(f"{rig.design.name}_armature")
+        armature = bpy.data.objects.new(data.name, data)
+        rig.collection.objects.link(armature)
+        armature.select_set(True)
+        armatures.append(armature)
 
-def load(
-    context: bpy.types.Context,
-    filepath: str,
-    *,
-    recenter_to_origin: bool = False,
-    seperate_blocks: bool = True,
+    if context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+    context.view_layer.objects.active = armatures[0]
+
+    bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+    bones = [_add_turret_bones(armature, rig.design) for armature, rig in zip(armatures, rigs)]
+    bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+    for armature, rig, names in zip(armatures, rigs, bones):
+        _add_turret_constraints(armature, names)
+
+        # link rig to mesh
+        for o, b in zip(rig.objects, names):
+            o.parent = armature
+            o.parent_type = 'BONE'
+            o.parent_bone = b
+
+        armature.matrix_world = rig.global_matrix # ?!?
+        armature.select_set(rig.select)
+
+        for o in rig.objects:
+            o.matrix_world = rig.global_matrix @ o.matrix_world
+            o.select_set(rig.select)
+
+    return armatures
+
+
+def import_turret(
+    context: Context,
+    collection: Collection,
+    design: Turret,
+    global_matrix: Matrix,
+    seperate_blocks: bool = False,
+    color_domain: str = 'FACE',
+    select: bool = True,
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+    rigs: list[TurretRig] | None = None,
+) -> None:
+    # rigs: collects the rig instead of building it, for build_turret_rigs over many turrets
+    if seperate_blocks:
+        if design.coaxial:
+            for o in generate_objects(design.base.blocks, design.name, Vector(design.base.origin.tolist()), seperate_blocks, color_domain=color_domain, timings=timings, memory=memory):
+                collection.objects.link(o)
+                o.matrix_world = global_matrix @ o.matrix_world
+                o.select_set(select)
+        else:
+            for part in (design.base, design.body, design.barrel):
+                part_collection = bpy.data.collections.new(f"{design.name}.{part.part}")
+                collection.children.link(part_collection)
+                for o in generate_objects(part.blocks, f"{design.name}.{part.part}", Vector(part.origin.tolist()), seperate_blocks, color_domain=color_domain, timings=timings, memory=memory):
+                    part_collection.objects.link(o)
+                    o.matrix_world = global_matrix @ o.matrix_world
+                    o.select_set(select)
+
+        # do not rig for now
+    else:
+        if design.coaxial:
+            objects = [*generate_objects(design.base.blocks, design.name, Vector(design.base.origin.tolist()), seperate_blocks, color_domain=color_domain, timings=timings, memory=memory)]
+        else:
+            objects = []
+            # implement iter ?!?
+            for part in (design.base, design.body, design.barrel):
+                objects.extend(generate_objects(part.blocks, f"{design.name}.{part.part}", Vector(part.origin.tolist()), seperate_blocks, color_domain=color_domain, timings=timings, memory=memory))
+
+        for o in objects:
+            collection.objects.link(o)
+            # o.matrix_world = global_matrix @ o.matrix_world
+            # o.select_set(True)
+
+        if not design.coaxial:
+            rig = TurretRig(collection, design, objects, global_matrix, select)
+            if rigs is not None:
+                rigs.append(rig)
+            else:
+                with timings.stage("rig"):
+                    build_turret_rigs(context, [rig])
+            return
+
+        for o in objects:
+            o.matrix_world = global_matrix @ o.matrix_world
+            o.select_set(select)
+
+
+def _find_layer_collection(layer: LayerCollection, collection: Collection) -> LayerCollection | None:
+    if layer.collection == collection:
+        return layer
+
+    for child in layer.children:
+        if (found := _find_layer_collection(child, collection)) is not None:
+            return found
+
+    return None
+
+
+def ship_turret_steps(
+    context: Context,
+    collection: Collection,
+    design: Ship,
+    parent: Object,
+    seperate_blocks: bool = False,
+    color_domain: str = 'FACE',
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> Generator[int, None, list[Object]]:
+    # yields once per turret, returns the instances
+    assert context.view_layer
+
+    designs = bpy.data.collections.new(f"{design.name}.turret_designs")
+    collection.children.link(designs)
+
+    # identical designs share one collection, placed through collection instances
+    prototypes: dict[str, Collection] = {}
+    blocks = {block.index: block for block in design.blocks}
+    instances = []
+    rigs: list[TurretRig] = []
+
+    for i, turret in enumerate(design.turrets):
+        # never left at the ship origin, parse_steps already drops turrets without their block
+        if (block := blocks.get(turret.parent)) is None:
+            yield 1
+            continue
+
+        with timings.stage("turret digest"):
+            key = turret.digest()
+
+        if (prototype := prototypes.get(key)) is None:
+            prototype = bpy.data.collections.new(f"{design.name}.turret_design{len(prototypes)}")
+            designs.children.link(prototype)
+            import_turret(context, prototype, replace(turret, name=prototype.name), Matrix(), seperate_blocks, color_domain,
+                          select=False, timings=timings, memory=memory, rigs=rigs)
+            prototypes[key] = prototype
+
+        obj = bpy.data.objects.new(f"{design.name}.turret{i}", None)
+        obj.instance_type = 'COLLECTION'
+        obj.instance_collection = prototype
+        obj.empty_display_size = turret.size
+
+        collection.objects.link(obj)
+        obj.parent = parent
+        obj.matrix_basis = Matrix(mount_matrix(block).tolist())
+
+        instances.append(obj)
+        yield 1
+
+    # one edit mode round trip for every design, before the prototypes leave the view layer
+    with timings.stage("rig"):
+        build_turret_rigs(context, rigs)
+
+    if (layer := _find_layer_collection(context.view_layer.layer_collection, designs)) is not None:
+        layer.exclude = True
+
+    return instances
+
+
+class DataSnapshot:
+    # datablocks existing before an import, everything new and named after the design can be removed again
+    __slots__ = ("prefix", "pointers")
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        # by position, bpy.data collections are new python objects on every access
+        self.pointers = [{d.as_pointer() for d in data} for data in self._collections()]
+
+    @staticmethod
+    def _collections():
+        # users first, so removal never leaves dangling references
+        return (bpy.data.objects, bpy.data.collections, bpy.data.meshes, bpy.data.armatures)
+
+    def _created(self):
+        for data, before in zip(self._collections(), self.pointers):
+            yield data, [d for d in data if d.as_pointer() not in before and d.name.startswith(self.prefix)]
+
+    def created(self) -> list[bpy.types.ID]:
+        return [block for _, blocks in self._created() for block in blocks]
+
+    def restore(self) -> None:
+        for data, blocks in self._created():
+            for block in blocks:
+                data.remove(block)
+
+
+@dataclass(frozen=True, slots=True)
+class ImportOptions:
+    # everything that shapes an import, named like the operator properties
+    recenter_to_origin: bool = False
+    seperate_blocks: bool = True
+    split_mode: str = 'NONE'
+    system_blocks: str = 'INCLUDE'
+    color_domain: str = 'FACE'
+    import_turrets: bool = True
+    memory_budget: int = 0
+    over_budget: str = 'MERGE'
+    block_filter: BlockFilter | None = None
+    validation: str = 'WARN'
+    use_cache: bool = True
+    material_mode: str = 'MATERIAL'
+    uv_density: float = 0.0
+    symmetry: bool = False
+    interior_blocks: str = 'KEEP'
     global_matrix: Matrix | None = None
-):
-    name = Path(filepath).stem
-    wm = context.window_manager
+
+    @property
+    def cache(self) -> DesignCache | None:
+        return DESIGN_CACHE if self.use_cache else None
+
+
+def _preflight(types: npt.NDArray[np.int64], seperate_blocks: bool, color_domain: str,
+               memory_budget: int, over_budget: str, memory: MemoryTracker) -> bool:
+    # returns the (possibly downgraded) block mode, raises if even merged blocks exceed the budget
+    memory.estimate = estimate = estimate_import(types, seperate_blocks, color_domain)
+
+    if memory_budget and estimate.total > memory_budget << 20:
+        merged = estimate_import(types, False, color_domain)
+
+        if over_budget == 'MERGE' and seperate_blocks and merged.total <= memory_budget << 20:
+            memory.warnings.append(f"Estimated {estimate} exceeds the budget of {memory_budget} MiB, merging blocks.")
+            memory.estimate = merged
+            return False
+        raise MemoryBudgetError(f"Estimated {estimate} exceeds the budget of {memory_budget} MiB.")
+
+    return seperate_blocks
+
+
+def parse_steps(
+    filepath: str,
+    name: str,
+    options: ImportOptions = ImportOptions(),
+    cache: DesignCache | None = None,
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> Generator[float, None, tuple[Ship | Turret, bool]]:
+    # bpy free, yields the progress in [0, 0.5], returns the design and the (possibly downgraded) block mode
+    # progress: 0.0-0.2 xml, 0.2-0.5 blocks
+    seperate_blocks, color_domain = options.seperate_blocks, options.color_domain
+    memory_budget, over_budget = options.memory_budget, options.over_budget
+    block_filter, validation = options.block_filter, options.validation
+    if cache is not None:
+        key = cache.key(filepath, block_filter, validation)
+        if (entry := cache.get(key)) is not None:
+            timings.count("cached designs", 1)
+            memory.warnings.extend(entry.warnings)
+            design = entry.design
+            parts = design.turrets if isinstance(design, Ship) else [design]
+            blocks = itertools.chain(design.blocks if isinstance(design, Ship) else [],
+                                     *(p.blocks for t in parts for p in (t.base, t.body, t.barrel)))
+            types = np.fromiter((b.type for b in blocks), np.int64)
+            return design, _preflight(types, seperate_blocks, color_domain, memory_budget, over_budget, memory)
+
+    size = max(1, Path(filepath).stat().st_size)
+    parser = ElementTree.XMLParser()
+    with open(filepath, "rb") as f:
+        while chunk := f.read(STEP_BYTES):
+            with timings.stage("parse xml"):
+                parser.feed(chunk)
+            yield 0.2 * f.tell() / size
+
+    with timings.stage("parse xml"):
+        root = parser.close()
+
+    if root.tag not in ("ship_design","turret_design", "plan"):
+        raise IOError("Invalid file format.")
+
+    # filters only apply to the hull of ships and plans, rejected items never become a Block
+    items = root.findall(Ship.item_path(root.tag)) if root.tag != "turret_design" else []
+    if block_filter is not None:
+        with timings.stage("filter"):
+            kept = block_filter.apply(items)
+        timings.count("filtered blocks", len(items) - len(kept))
+        items = kept
+
+    # broken hull blocks are caught before any Block or geometry exists
+    warnings = []
+    if validation != 'OFF' and items:
+        with timings.stage("validate"):
+            # parents of filtered blocks are gone on purpose
+            report = validate_xml(items, parents=block_filter is None)
+        if not report.ok:
+            if validation == 'ABORT':
+                raise ValidationError(f"{name}: {report.summary()}")
+            warnings.append(f"{name}: {report.summary()}".replace("\n", "; "))
+            # even WARN drops malformed items, the parser cannot read them
+            invalid = report.invalid() if validation == 'SKIP' else report.malformed()
+            items = [item for item, skip in zip(items, invalid) if not skip]
+            timings.count("invalid blocks", int(invalid.sum()))
+
+    memory.warnings.extend(warnings)
+
+    turrets_xml = []
+    if root.tag != "turret_design":
+        turrets_xml = Ship.mounted_turrets(root, items)
+        timings.count("dropped turrets", len(root.findall("turretDesign")) - len(turrets_xml))
+
+    # pre-flight, nothing but the xml tree has been allocated yet
+    if root.tag == "turret_design":
+        blocks_xml = root.iter("block")
+    else:
+        blocks_xml = itertools.chain((item.find("block") for item in items),
+                                     *(turret.iter("block") for turret in turrets_xml))
+    types = np.fromiter((int(b.get("index", 0)) for b in blocks_xml if b is not None), np.int64)
+    seperate_blocks = _preflight(types, seperate_blocks, color_domain, memory_budget, over_budget, memory)
+
+    if root.tag == "turret_design":
+        with timings.stage("parse design"):
+            design = Turret.from_xml(root, name)
+        memory.allocate("blocks", BLOCK_BYTES * len(types))
+        if cache is not None:
+            cache.put(key, design, warnings)
+        return design, seperate_blocks
+
+    blocks = []
+    for start in range(0, len(items), STEP_BLOCKS):
+        with timings.stage("parse design"):
+            blocks.extend(Block.from_xml(item) for item in items[start:start + STEP_BLOCKS])
+        yield 0.2 + 0.3 * len(blocks) / max(1, len(items))
+
+    with timings.stage("parse design"):
+        design = Ship(name=name, blocks=blocks, turrets=[Turret.from_xml(t) for t in turrets_xml])
+    memory.allocate("blocks", BLOCK_BYTES * len(types))
+    if cache is not None:
+        cache.put(key, design, warnings)
+
+    return design, seperate_blocks
+
+
+def _forward_progress(wm, steps: Generator[float, None, T]) -> Generator[float, None, T]:
+    while True:
+        try:
+            progress = next(steps)
+        except StopIteration as e:
+            return e.value
+
+        wm.progress_update(progress)
+        yield progress
+
+
+def _prepare_scene(context: Context) -> tuple[bpy.types.ViewLayer, Collection]:
     vl = context.view_layer
 
     assert vl
@@ -192,78 +839,237 @@ def load(
     for o in context.scene.objects:
         o.select_set(False)
 
-    ac = vl.active_layer_collection.collection
+    return vl, vl.active_layer_collection.collection
 
-    global_matrix = global_matrix or Matrix()
 
-    xml = ElementTree.parse(filepath)
-    root = xml.getroot()
+def _mesh_pointers() -> set[int]:
+    return {mesh.as_pointer() for mesh in bpy.data.meshes}
 
-    if root.tag not in ("ship_design","turret_design", "plan"):
-        raise IOError("Invalid file format.")
 
-    if root.tag == "turret_design":
-        design = Turret.from_xml(root, name)
+def _new_meshes(before: set[int]) -> list[Mesh]:
+    # shared turret prototypes are only counted once
+    return [mesh for mesh in bpy.data.meshes if mesh.as_pointer() not in before]
 
 
-        collection = bpy.data.collections.new(design.name)
-        ac.children.link(collection)
+def _ship_root(collection: Collection, design: Ship, global_matrix: Matrix) -> Object:
+    obj = bpy.data.objects.new(design.name, None)
+    collection.objects.link(obj)
+    obj.matrix_world = global_matrix @ obj.matrix_world
+    obj.select_set(True)
+    return obj
 
-        if seperate_blocks:
-            if design.coaxial:
-                for o in generate_objects(design.base.blocks, design.name, Vector(design.base.origin.tolist()), seperate_blocks):
-                    collection.objects.link(o)
-                    o.matrix_world = global_matrix @ o.matrix_world
-                    o.select_set(True)
-            else:
-                for part in (design.base, design.body, design.barrel):
-                    part_collection = bpy.data.collections.new(f"{design.name}.{part.part}")
-                    collection.children.link(part_collection)
-                    for o in generate_objects(part.blocks, f"{design.name}.{part.part}", Vector(part.origin.tolist()), seperate_blocks):
-                        part_collection.objects.link(o)
-                        o.matrix_world = global_matrix @ o.matrix_world
-                        o.select_set(True)
-
-            # do not rig for now
-        else:
-            if design.coaxial:
-                objects = [*generate_objects(design.base.blocks, design.name, Vector(design.base.origin.tolist()), seperate_blocks)]
-            else:
-                objects = []
-                # implement iter ?!?
-                for part in (design.base, design.body, design.barrel):
-                    objects.extend(generate_objects(part.blocks, f"{design.name}.{part.part}", Vector(part.origin.tolist()), seperate_blocks))
 
-            for o in objects:
-                collection.objects.link(o)
-                # o.matrix_world = global_matrix @ o.matrix_world
-                # o.select_set(True)
+def _link_hull(collection: Collection, obj: Object, parent: Object, timings: Timings) -> None:
+    with timings.stage("link"):
+        collection.objects.link(obj)
+        obj.parent = parent
 
-            if not design.coaxial:
-                armature, bones = create_turret_armature(context, collection, design, name)
 
-                # link rig to mesh
-                for o, b in zip(objects, bones):
-                    o.parent = armature
-                    o.parent_type = 'BONE'
-                    o.parent_bone = b
+def _import_turret_design(context: Context, collection: Collection, design: Turret, global_matrix: Matrix,
+                          seperate_blocks: bool, color_domain: str, timings: Timings, memory: MemoryTracker) -> None:
+    turret_collection = bpy.data.collections.new(design.name)
+    collection.children.link(turret_collection)
 
-                armature.matrix_world = global_matrix # ?!?
+    import_turret(context, turret_collection, design, global_matrix, seperate_blocks, color_domain, timings=timings, memory=memory)
 
-            for o in objects:
-                o.matrix_world = global_matrix @ o.matrix_world
-                o.select_set(True)
-    else:
-        design = Ship.from_xml(root, name)
 
-        obj = bpy.data.objects.new(design.name, None)
-        for o in generate_objects(design.blocks, f"{design.name}.hull", None, seperate_blocks):
-           ac.objects.link(o)
-           o.parent = obj
+def _start_design(context: Context, collection: Collection, design: Ship | Turret, seperate_blocks: bool,
+                  options: ImportOptions, timings: Timings, memory: MemoryTracker) -> Object | None:
+    # turret designs are imported right away, ships get the root their hull and turrets are parented to
+    global_matrix = options.global_matrix or Matrix()
+    if isinstance(design, Turret):
+        _import_turret_design(context, collection, design, global_matrix, seperate_blocks, options.color_domain,
+                              timings, memory)
+        return None
+    return _ship_root(collection, design, global_matrix)
+
+
+def _hull_steps(design: Ship, seperate_blocks: bool, options: ImportOptions, cache: DesignCache | None,
+                timings: Timings, memory: MemoryTracker) -> Iterator[int | MeshData]:
+    entry = cache.entry_of(design) if cache is not None else None
+    return mesh_data_steps(design.blocks, f"{design.name}.hull", None, seperate_blocks, options.split_mode,
+                           options.system_blocks, timings, memory, entry and entry.geometries, options.symmetry,
+                           options.interior_blocks)
+
+
+def _finish_steps(
+    context: Context,
+    collection: Collection,
+    design: Ship | Turret,
+    root: Object | None,
+    seperate_blocks: bool,
+    options: ImportOptions,
+    meshes: set[int],
+    timings: Timings,
+    memory: MemoryTracker,
+) -> Generator[float, None, None]:
+    # everything after the hull: turrets, materials and uvs, progress 0.95-1.0
+    wm = context.window_manager
+
+    if isinstance(design, Ship) and options.import_turrets and design.turrets:
+        steps = ship_turret_steps(context, collection, design, root, seperate_blocks, options.color_domain, timings, memory)
+        for i, _ in enumerate(steps, 1):
+            wm.progress_update(progress := 0.95 + 0.05 * i / len(design.turrets))
+            yield progress
+
+    new_meshes = _new_meshes(meshes)
+    with timings.stage("materials"):
+        assign_materials(new_meshes, options.material_mode, design.name)
+
+    with timings.stage("view layer update"):
+        context.view_layer.update()
+
+    # projected in world space, so after the update that places the objects
+    with timings.stage("uvs"):
+        memory.allocate("uvs", UV_BYTES * assign_uvs(new_meshes, options.uv_density))
+
+
+def load_steps(
+    context: bpy.types.Context,
+    filepath: str,
+    options: ImportOptions = ImportOptions(),
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> Generator[float, None, set[str]]:
+    # yields the progress in [0, 1] after every bounded unit of work
+    # progress: 0.0-0.5 parsing, 0.5-0.95 meshes, 0.95-1.0 turrets
+    name = Path(filepath).stem
+    wm = context.window_manager
+    _, ac = _prepare_scene(context)
+    meshes = _mesh_pointers()
+
+    wm.progress_begin(0.0, 1.0)
+    try:
+        design, seperate_blocks = yield from _forward_progress(
+            wm, parse_steps(filepath, name, options, options.cache, timings, memory))
+        obj = _start_design(context, ac, design, seperate_blocks, options, timings, memory)
+
+        if isinstance(design, Ship):
+            done = 0
+            for item in _hull_steps(design, seperate_blocks, options, options.cache, timings, memory):
+                if isinstance(item, MeshData):
+                    _link_hull(ac, realize_mesh(item, options.color_domain, timings, memory), obj, timings)
+                    continue
+                done += item
+                wm.progress_update(progress := 0.5 + 0.45 * done / max(1, len(design.blocks)))
+                yield progress
+
+        yield from _finish_steps(context, ac, design, obj, seperate_blocks, options, meshes, timings, memory)
+    finally:
+        wm.progress_end()
+
+    return {'FINISHED'}
+
+
+def load(
+    context: bpy.types.Context,
+    filepath: str,
+    options: ImportOptions = ImportOptions(),
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> set[str]:
+    return _drain(load_steps(context, filepath, options, timings, memory))
+
+
+class BackgroundLoader(threading.Thread):
+    # parses and builds mesh data off the main thread, bpy is only touched by the consumer of the queue
+    def __init__(
+        self,
+        filepath: str,
+        name: str,
+        options: ImportOptions,
+        timings: Timings = NO_TIMINGS,
+        memory: MemoryTracker = NO_MEMORY,
+    ) -> None:
+        super().__init__(name=f"avorion-import-{name}", daemon=True)
+        self.messages: queue.SimpleQueue[tuple[str, object]] = queue.SimpleQueue()
+        self.cancelled = threading.Event()
+
+        # the cache is resolved here, on the main thread
+        cache = options.cache
+        self._parse = lambda: parse_steps(filepath, name, options, cache, timings, memory)
+        self._mesh_data = lambda design, seperate_blocks: _hull_steps(
+            design, seperate_blocks, options, cache, timings, memory)
+
+    def run(self) -> None:
+        try:
+            steps = self._parse()
+            while True:
+                if self.cancelled.is_set():
+                    return
+                try:
+                    self.messages.put(("progress", next(steps)))
+                except StopIteration as e:
+                    design, seperate_blocks = e.value
+                    break
+
+            self.messages.put(("design", (design, seperate_blocks)))
+
+            if isinstance(design, Ship):
+                done = 0
+                for item in self._mesh_data(design, seperate_blocks):
+                    if self.cancelled.is_set():
+                        return
+                    if isinstance(item, MeshData):
+                        self.messages.put(("mesh", item))
+                    else:
+                        done += item
+                        self.messages.put(("progress", 0.5 + 0.45 * done / max(1, len(design.blocks))))
+
+            self.messages.put(("done", None))
+        except Exception as e:
+            self.messages.put(("error", e))
+
+
+def background_load_steps(
+    context: bpy.types.Context,
+    filepath: str,
+    options: ImportOptions = ImportOptions(),
+    timings: Timings = NO_TIMINGS,
+    memory: MemoryTracker = NO_MEMORY,
+) -> Generator[float | None, None, set[str]]:
+    # like load_steps, but parsing and geometry run in a BackgroundLoader
+    # yields None while waiting for the loader, meshes are linked as they arrive
+    name = Path(filepath).stem
+    wm = context.window_manager
+    _, ac = _prepare_scene(context)
+    meshes = _mesh_pointers()
+
+    loader = BackgroundLoader(filepath, name, options, timings, memory)
+
+    wm.progress_begin(0.0, 1.0)
+    loader.start()
+    try:
+        design, seperate_blocks, obj = None, options.seperate_blocks, None
+        progress = 0.0
+
+        while True:
+            try:
+                kind, value = loader.messages.get_nowait()
+            except queue.Empty:
+                if not loader.is_alive() and loader.messages.empty():
+                    raise RuntimeError("Background import stopped unexpectedly.")
+                yield None
+                continue
+
+            match kind:
+                case "progress":
+                    wm.progress_update(progress := value)
+                    yield progress
+                case "design":
+                    design, seperate_blocks = value
+                    obj = _start_design(context, ac, design, seperate_blocks, options, timings, memory)
+                case "mesh":
+                    _link_hull(ac, realize_mesh(value, options.color_domain, timings, memory), obj, timings)
+                    yield progress
+                case "error":
+                    raise value
+                case "done":
+                    break
 
-        ac.objects.link(obj)
-        obj.matrix_world = global_matrix @ obj.matrix_world
-        obj.select_set(True)
-    vl.update()
+        yield from _finish_steps(context, ac, design, obj, seperate_blocks, options, meshes, timings, memory)
+    finally:
+        loader.cancelled.set()
+        wm.progress_end()
 
     return {'FINISHED'}
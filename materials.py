@@ -0,0 +1,285 @@
+from collections.abc import Iterable
+
+import bpy
+import numpy as np
+import numpy.typing as npt
+from bpy.types import Material, Mesh, NodeTree
+
+from .avorion_utils.categories import CATEGORY_NAMES, MATERIALS
+from .avorion_utils.colors import pack_colors, palette_atlas
+from .avorion_utils.uv import box_uvs
+
+
+# bump when the node setup changes, stale datablocks are rebuilt in place so slot assignments survive
+LIBRARY_VERSION = 1
+VERSION_KEY = "avorion_library_version"
+
+NODE_GROUP = "Avorion Block"
+MATERIAL_PREFIX = "Avorion "
+PALETTE_UV = "Palette"
+
+
+def _linear(hex_color: str) -> tuple[float, float, float, float]:
+    srgb = np.array([int(hex_color[i:i + 2], 16) for i in (1, 3, 5)]) / 255
+    rgb = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    return (*rgb.tolist(), 1.0)
+
+
+def _is_current(data) -> bool:
+    return data is not None and data.get(VERSION_KEY) == LIBRARY_VERSION
+
+
+def block_node_group() -> NodeTree:
+    # shared shader: the "Color" and "Secondary Color" face attributes, tinted per material
+    group = bpy.data.node_groups.get(NODE_GROUP)
+    if _is_current(group):
+        return group
+
+    if group is None:
+        group = bpy.data.node_groups.new(NODE_GROUP, 'ShaderNodeTree')
+    group.nodes.clear()
+    group.interface.clear()
+
+    for name, socket, default in (
+        ("Tint", 'NodeSocketColor', (1.0, 1.0, 1.0, 1.0)),
+        ("Tint Strength", 'NodeSocketFloat', 0.0),
+        ("Secondary", 'NodeSocketFloat', 0.0),
+        ("Metallic", 'NodeSocketFloat', 0.5),
+        ("Roughness", 'NodeSocketFloat', 0.4),
+    ):
+        group.interface.new_socket(name, in_out='INPUT', socket_type=socket).default_value = default
+    group.interface.new_socket("BSDF", in_out='OUTPUT', socket_type='NodeSocketShader')
+
+    nodes, links = group.nodes, group.links
+    inputs = nodes.new('NodeGroupInput')
+    outputs = nodes.new('NodeGroupOutput')
+
+    primary = nodes.new('ShaderNodeAttribute')
+    primary.attribute_type = 'GEOMETRY'
+    primary.attribute_name = "Color"
+    secondary = nodes.new('ShaderNodeAttribute')
+    secondary.attribute_type = 'GEOMETRY'
+    secondary.attribute_name = "Secondary Color"
+
+    # mix node sockets: 0 factor, 6 color a, 7 color b, output 2 color result
+    paint = nodes.new('ShaderNodeMix')
+    paint.data_type = 'RGBA'
+    tint = nodes.new('ShaderNodeMix')
+    tint.data_type = 'RGBA'
+    tint.blend_type = 'MULTIPLY'
+
+    bsdf = nodes.new('ShaderNodeBsdfPrincipled')
+
+    links.new(inputs.outputs["Secondary"], paint.inputs[0])
+    links.new(primary.outputs["Color"], paint.inputs[6])
+    links.new(secondary.outputs["Color"], paint.inputs[7])
+    links.new(inputs.outputs["Tint Strength"], tint.inputs[0])
+    links.new(paint.outputs[2], tint.inputs[6])
+    links.new(inputs.outputs["Tint"], tint.inputs[7])
+    links.new(tint.outputs[2], bsdf.inputs["Base Color"])
+    links.new(inputs.outputs["Metallic"], bsdf.inputs["Metallic"])
+    links.new(inputs.outputs["Roughness"], bsdf.inputs["Roughness"])
+    links.new(bsdf.outputs["BSDF"], outputs.inputs["BSDF"])
+
+    for x, column in enumerate(((inputs, primary, secondary), (paint,), (tint,), (bsdf,), (outputs,))):
+        for y, node in enumerate(column):
+            node.location = (250 * x, -200 * y)
+
+    group[VERSION_KEY] = LIBRARY_VERSION
+    return group
+
+
+def library_material(name: str, tint: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+                     tint_strength: float = 0.0, metallic: float = 0.5, roughness: float = 0.4) -> Material:
+    material = bpy.data.materials.get(name)
+    if _is_current(material):
+        return material
+
+    if material is None:
+        material = bpy.data.materials.new(name)
+    material.use_nodes = True
+    material.diffuse_color = tint
+
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+    nodes.clear()
+
+    shader = nodes.new('ShaderNodeGroup')
+    shader.node_tree = block_node_group()
+    shader.inputs["Tint"].default_value = tint
+    shader.inputs["Tint Strength"].default_value = tint_strength
+    shader.inputs["Metallic"].default_value = metallic
+    shader.inputs["Roughness"].default_value = roughness
+
+    output = nodes.new('ShaderNodeOutputMaterial')
+    output.location = (300, 0)
+    links.new(shader.outputs["BSDF"], output.inputs["Surface"])
+
+    material[VERSION_KEY] = LIBRARY_VERSION
+    return material
+
+
+def tier_material(index: int) -> Material:
+    # one material per Avorion material tier, higher tiers are smoother and more metallic
+    if not 0 <= index < len(MATERIALS):
+        return library_material(f"{MATERIAL_PREFIX}Unknown")
+
+    tier = MATERIALS[index]
+    return library_material(
+        f"{MATERIAL_PREFIX}{tier.name}", _linear(tier.color), tint_strength=0.3,
+        metallic=0.4 + 0.05 * index, roughness=0.5 - 0.05 * index,
+    )
+
+
+def category_material(index: int) -> Material:
+    name = CATEGORY_NAMES[index] if 0 <= index < len(CATEGORY_NAMES) else "Unknown"
+    return library_material(f"{MATERIAL_PREFIX}{name}")
+
+
+def _face_colors(mesh: Mesh, name: str) -> npt.NDArray[np.uint32] | None:
+    # packed colors written by the importer, corner colors are read at the first corner of every face
+    attr = mesh.attributes.get(name)
+    if attr is None or attr.domain not in ('FACE', 'CORNER'):
+        return None
+
+    values = np.empty(len(attr.data) * 4, np.float32)
+    attr.data.foreach_get("color_srgb", values)
+    rgba = np.round(values.reshape(-1, 4) * 255).astype(np.uint8)
+
+    if attr.domain == 'CORNER':
+        starts = np.empty(len(mesh.polygons), np.int32)
+        mesh.polygons.foreach_get("loop_start", starts)
+        rgba = rgba[starts]
+
+    return pack_colors(rgba)
+
+
+def palette_material(name: str, pixels: npt.NDArray[np.uint8]) -> Material:
+    # unlit lookup of the palette texel, closest interpolation keeps neighbouring pairs from bleeding
+    height, width = pixels.shape[:2]
+    image = bpy.data.images.get(name)
+    if image is None or tuple(image.size) != (width, height):
+        if image is not None:
+            bpy.data.images.remove(image)
+        image = bpy.data.images.new(name, width, height, alpha=True)
+    image.pixels.foreach_set((pixels.astype(np.float32) / 255).reshape(-1))
+    image.pack()
+
+    material = bpy.data.materials.get(name) or bpy.data.materials.new(name)
+    material.use_nodes = True
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+    nodes.clear()
+
+    uv = nodes.new('ShaderNodeUVMap')
+    uv.uv_map = PALETTE_UV
+    texture = nodes.new('ShaderNodeTexImage')
+    texture.image = image
+    texture.interpolation = 'Closest'
+    bsdf = nodes.new('ShaderNodeBsdfPrincipled')
+    output = nodes.new('ShaderNodeOutputMaterial')
+
+    links.new(uv.outputs["UV"], texture.inputs["Vector"])
+    links.new(texture.outputs["Color"], bsdf.inputs["Base Color"])
+    links.new(bsdf.outputs["BSDF"], output.inputs["Surface"])
+
+    for x, node in enumerate((uv, texture, bsdf, output)):
+        node.location = (300 * x, 0)
+
+    return material
+
+
+def assign_palette(meshes: Iterable[Mesh], name: str) -> None:
+    # one material and one palette texture shared by every mesh, faces point at the texel of their color pair
+    painted, primary, secondary = [], [], []
+    for mesh in meshes:
+        if (colors := _face_colors(mesh, "Color")) is None:
+            continue
+        painted.append(mesh)
+        primary.append(colors)
+        secondary.append(s if (s := _face_colors(mesh, "Secondary Color")) is not None else colors)
+    if not painted:
+        return
+
+    atlas = palette_atlas(np.concatenate(primary), np.concatenate(secondary))
+    material = palette_material(f"{name} Palette", atlas.pixels)
+
+    start = 0
+    for mesh in painted:
+        faces = len(mesh.polygons)
+        offsets = np.empty(faces, np.int32)
+        mesh.polygons.foreach_get("loop_total", offsets)
+        uvs = np.repeat(atlas.texels[atlas.index[start:start + faces]], offsets, axis=0)
+        start += faces
+
+        layer = mesh.uv_layers.get(PALETTE_UV) or mesh.uv_layers.new(name=PALETTE_UV, do_init=False)
+        layer.uv.foreach_set("vector", uvs.reshape(-1))
+
+        mesh.materials.clear()
+        mesh.materials.append(material)
+        mesh.polygons.foreach_set("material_index", np.zeros(faces, np.int32))
+
+
+def assign_materials(meshes: Iterable[Mesh], mode: str = 'MATERIAL', name: str = "Avorion") -> None:
+    # one slot per tier or category present on the mesh, faces assigned with a single foreach_set
+    if mode == 'NONE':
+        return
+    if mode == 'PALETTE':
+        return assign_palette(meshes, name)
+
+    attribute, factory = {
+        'MATERIAL': ("material", tier_material),
+        'CATEGORY': ("category", category_material),
+    }[mode]
+    library: dict[int, Material] = {}
+
+    for mesh in meshes:
+        layer = mesh.attributes.get(attribute)
+        if layer is None or layer.domain != 'FACE':
+            continue
+
+        values = np.empty(len(mesh.polygons), np.int32)
+        layer.data.foreach_get("value", values)
+        keys, slots = np.unique(values, return_inverse=True)
+
+        mesh.materials.clear()
+        for key in keys.tolist():
+            if key not in library:
+                library[key] = factory(key)
+            mesh.materials.append(library[key])
+
+        mesh.polygons.foreach_set("material_index", slots.reshape(-1).astype(np.int32))
+
+
+def assign_uvs(meshes: Iterable[Mesh], density: float = 1.0, name: str = "UVMap") -> int:
+    # world space box projection, so textures tile seamlessly across blocks and objects, returns the corners written
+    if density <= 0:
+        return 0
+
+    owners = {o.data.as_pointer(): o for o in bpy.data.objects if o.type == 'MESH'}
+    written = 0
+
+    for mesh in meshes:
+        corners = len(mesh.loops)
+        if not corners:
+            continue
+
+        # shared meshes are projected with their first object
+        obj = owners.get(mesh.as_pointer())
+        matrix = np.array(obj.matrix_world) if obj is not None else np.eye(4)
+
+        co = np.empty(len(mesh.vertices) * 3)
+        mesh.vertices.foreach_get("co", co)
+        vertex = np.empty(corners, np.int32)
+        mesh.loops.foreach_get("vertex_index", vertex)
+        normals = np.empty(len(mesh.polygons) * 3)
+        mesh.polygons.foreach_get("normal", normals)
+        offsets = np.empty(len(mesh.polygons), np.int32)
+        mesh.polygons.foreach_get("loop_total", offsets)
+
+        positions = co.reshape(-1, 3)[vertex] @ matrix[:3, :3].T + matrix[:3, 3]
+        normals = normals.reshape(-1, 3) @ np.linalg.inv(matrix[:3, :3])
+
+        layer = mesh.uv_layers.get(name) or mesh.uv_layers.new(name=name, do_init=False)
+        layer.uv.foreach_set("vector", box_uvs(positions, normals, offsets, density).reshape(-1))
+        written += corners
+
+    return written
@@ -0,0 +1,211 @@
+from pathlib import Path
+
+import bpy
+import bpy.utils.previews
+import numpy as np
+from bpy.props import CollectionProperty, EnumProperty, FloatVectorProperty, IntProperty, PointerProperty, StringProperty
+from bpy.types import Operator, Panel, PropertyGroup, UIList
+
+from .appdirs import user_cache_dir, user_data_dir
+from .avorion_utils.library import Library
+
+
+_previews = None
+_library: Library | None = None
+
+
+def ships_folder() -> Path:
+    return Path(user_data_dir('Avorion', appauthor=False, roaming=True)) / "ships"
+
+
+def library() -> Library:
+    # metadata and previews live in the user cache, the ships folder is never written
+    global _library
+    if _library is None:
+        _library = Library(Path(user_cache_dir('AvorionImporter', appauthor=False)) / "library.db")
+    return _library
+
+
+def preview_icon(path: str) -> int:
+    if _previews is None:
+        return 0
+
+    if (preview := _previews.get(path)) is None:
+        preview = _previews.new(path)
+        if (pixels := library().preview(path)) is not None:
+            height, width, _ = pixels.shape
+            # blender images start at the bottom row
+            data = (pixels[::-1].astype(np.float32) / 255).reshape(-1)
+            preview.image_size = preview.icon_size = (width, height)
+            preview.image_pixels_float.foreach_set(data)
+            preview.icon_pixels_float.foreach_set(data)
+
+    return preview.icon_id
+
+
+class AvorionLibraryEntry(PropertyGroup):
+    path: StringProperty(subtype='FILE_PATH')
+    root: StringProperty()
+    blocks: IntProperty()
+    turrets: IntProperty()
+    dimensions: FloatVectorProperty(size=3, subtype='XYZ')
+
+
+class AvorionLibrary(PropertyGroup):
+    entries: CollectionProperty(type=AvorionLibraryEntry)
+    active: IntProperty()
+
+    root: EnumProperty(
+        name="Type",
+        items=(
+            ('ALL', "All", "Show every design"),
+            ('ship_design', "Ships", "Show ship designs"),
+            ('plan', "Plans", "Show plain block plans"),
+            ('turret_design', "Turrets", "Show turret designs"),
+        ),
+        default='ALL'
+    )
+
+    min_blocks: IntProperty(name="Min Blocks", default=0, min=0)
+    max_blocks: IntProperty(name="Max Blocks", description="0 disables the limit", default=0, min=0)
+
+
+class AVORION_UL_library(UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.label(text=item.name, icon_value=preview_icon(item.path))
+        row.label(text=f"{item.blocks} blocks")
+
+    def filter_items(self, context, data, propname):
+        # everything is in memory, so filtering stays instant for thousands of designs
+        settings = data
+        entries = getattr(data, propname)
+        helper = bpy.types.UI_UL_list
+
+        flags = helper.filter_items_by_name(self.filter_name, self.bitflag_filter_item, entries, "name") \
+            or [self.bitflag_filter_item] * len(entries)
+
+        for i, entry in enumerate(entries):
+            if (settings.root != 'ALL' and entry.root != settings.root) \
+                    or entry.blocks < settings.min_blocks \
+                    or (settings.max_blocks and entry.blocks > settings.max_blocks):
+                flags[i] &= ~self.bitflag_filter_item
+
+        order = helper.sort_items_by_name(entries, "name") if self.use_filter_sort_alpha else []
+        return flags, order
+
+
+class AVORION_OT_library_refresh(Operator):
+    """Index new and changed designs in the Avorion ships folder"""
+    bl_idname = "avorion.library_refresh"
+    bl_label = "Refresh Ship Library"
+
+    def execute(self, context):
+        folder = ships_folder()
+        if not folder.is_dir():
+            self.report({'ERROR'}, f"Ships folder not found: {folder}")
+            return {'CANCELLED'}
+
+        scanned, removed, failures = library().update(folder)
+        for path, error in failures:
+            self.report({'WARNING'}, f"{Path(path).name}: {error}")
+
+        if _previews is not None:
+            _previews.clear()
+
+        settings = context.window_manager.avorion_library
+        settings.entries.clear()
+        for info in library().query():
+            entry = settings.entries.add()
+            entry.name = info.name
+            entry.path = info.path
+            entry.root = info.root
+            entry.blocks = info.blocks
+            entry.turrets = info.turrets
+            entry.dimensions = info.dimensions
+
+        self.report({'INFO'}, f"{len(settings.entries)} designs, {scanned} scanned, {removed} removed")
+        return {'FINISHED'}
+
+
+class AVORION_OT_library_import(Operator):
+    """Import the selected design of the ship library"""
+    bl_idname = "avorion.library_import"
+    bl_label = "Import Design"
+    bl_options = {'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        settings = context.window_manager.avorion_library
+        return 0 <= settings.active < len(settings.entries)
+
+    def execute(self, context):
+        settings = context.window_manager.avorion_library
+        return bpy.ops.avorion.import_xml('EXEC_DEFAULT', filepath=settings.entries[settings.active].path)
+
+
+class AVORION_PT_library(Panel):
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Avorion"
+    bl_label = "Ship Library"
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.window_manager.avorion_library
+
+        row = layout.row(align=True)
+        row.prop(settings, "root", text="")
+        row.operator(AVORION_OT_library_refresh.bl_idname, text="", icon='FILE_REFRESH')
+
+        row = layout.row(align=True)
+        row.prop(settings, "min_blocks", text="Min")
+        row.prop(settings, "max_blocks", text="Max")
+
+        layout.template_list("AVORION_UL_library", "", settings, "entries", settings, "active", rows=8)
+
+        if 0 <= settings.active < len(settings.entries):
+            entry = settings.entries[settings.active]
+            box = layout.box()
+            box.template_icon(icon_value=preview_icon(entry.path), scale=6.0)
+            col = box.column(align=True)
+            col.label(text=f"{entry.root}, {entry.blocks} blocks, {entry.turrets} turrets")
+            col.label(text="Size: {:.1f} x {:.1f} x {:.1f}".format(*entry.dimensions))
+            layout.operator(AVORION_OT_library_import.bl_idname, icon='IMPORT')
+
+
+classes = (
+    AvorionLibraryEntry,
+    AvorionLibrary,
+    AVORION_UL_library,
+    AVORION_OT_library_refresh,
+    AVORION_OT_library_import,
+    AVORION_PT_library,
+)
+
+
+def register():
+    global _previews
+
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+    bpy.types.WindowManager.avorion_library = PointerProperty(type=AvorionLibrary)
+    _previews = bpy.utils.previews.new()
+
+
+def unregister():
+    global _previews, _library
+
+    if _previews is not None:
+        bpy.utils.previews.remove(_previews)
+        _previews = None
+
+    if _library is not None:
+        _library.close()
+        _library = None
+
+    del bpy.types.WindowManager.avorion_library
+
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,234 @@
+import itertools
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import bpy
+from bpy.types import Collection, Context, LayerCollection, Object, Operator, Panel
+
+from . import import_avorion_xml
+from .avorion_utils.watcher import FileWatcher
+
+
+# seconds between two polls of the watched files, a poll is one stat per file
+POLL_INTERVAL = 1.0
+# custom property on every datablock of a watched import, holds the real path of its design
+SOURCE_KEY = "avorion_source"
+
+_watcher = FileWatcher()
+# import options of every watched file
+_options: dict[str, import_avorion_xml.ImportOptions] = {}
+
+
+def _tagged(path: str) -> list[bpy.types.ID]:
+    # in removal order, users first
+    return [d for data in import_avorion_xml.DataSnapshot._collections() for d in data if d.get(SOURCE_KEY) == path]
+
+
+def _in_scene(path: str) -> bool:
+    # orphaned meshes and armatures keep their tag after the objects were deleted, only linked objects count
+    return any(o.get(SOURCE_KEY) == path and o.users_scene for o in bpy.data.objects)
+
+
+def watch_file(filepath: str, options: import_avorion_xml.ImportOptions, created: list[bpy.types.ID]) -> None:
+    path = _watcher.watch(filepath)
+    for block in created:
+        block[SOURCE_KEY] = path
+    _options[path] = options
+
+    if not bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.register(_poll, first_interval=POLL_INTERVAL, persistent=True)
+
+
+def unwatch_file(path: str) -> None:
+    _watcher.unwatch(path)
+    _options.pop(os.path.realpath(path), None)
+
+
+def _find_layer(layer: LayerCollection, collection: Collection) -> LayerCollection | None:
+    if layer.collection == collection:
+        return layer
+    return next((found for child in layer.children if (found := _find_layer(child, collection))), None)
+
+
+@contextmanager
+def _active_collection(context: Context, collection: Collection):
+    vl = context.view_layer
+    active = vl.active_layer_collection
+    if (layer := _find_layer(vl.layer_collection, collection)) is not None:
+        vl.active_layer_collection = layer
+    try:
+        yield
+    finally:
+        vl.active_layer_collection = active
+
+
+def _target_collection(context: Context, path: str) -> Collection:
+    # the collection the previous import was linked into
+    for collection in itertools.chain([context.scene.collection], bpy.data.collections):
+        if collection.get(SOURCE_KEY) == path:
+            continue
+        if any(o.get(SOURCE_KEY) == path for o in collection.objects) \
+                or any(c.get(SOURCE_KEY) == path for c in collection.children):
+            return collection
+    return context.scene.collection
+
+
+def _modifier_settings(modifier: bpy.types.Modifier, tagged: set[str]) -> dict[str, object]:
+    # rna settings and id properties (geometry nodes inputs), objects of the old import are kept by name
+    settings = {}
+    for prop in modifier.bl_rna.properties:
+        if prop.is_readonly or prop.identifier in ("name", "type"):
+            continue
+        value = getattr(modifier, prop.identifier)
+        if isinstance(value, Object) and value.name in tagged:
+            value = ("object", value.name)
+        settings[prop.identifier] = value
+    return settings | {f"[{key}]": modifier[key] for key in modifier.keys()}
+
+
+def _apply_settings(modifier: bpy.types.Modifier, settings: dict[str, object]) -> None:
+    for key, value in settings.items():
+        if isinstance(value, tuple) and len(value) == 2 and value[0] == "object":
+            value = bpy.data.objects.get(value[1])
+        try:
+            if key.startswith("["):
+                modifier[key[1:-1]] = value
+            else:
+                setattr(modifier, key, value)
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+
+def reimport(context: Context, path: str) -> None:
+    options = _options[path]
+    name = Path(path).stem
+
+    # parse first, a save caught half written must not remove the previous import
+    import_avorion_xml._drain(import_avorion_xml.parse_steps(path, name, options, options.cache))
+
+    old = _tagged(path)
+    objects = [o for o in old if isinstance(o, Object)]
+    names = {o.name for o in objects}
+
+    # roots keep where the user put them, the rest follows the design
+    roots = {
+        o.name: (o.matrix_world.copy(), o.parent if o.parent is not None and o.parent.name not in names else None,
+                 list(o.users_collection))
+        for o in objects if o.parent is None or o.parent.name not in names
+    }
+    modifiers = {o.name: [(m.name, m.type, _modifier_settings(m, names)) for m in o.modifiers] for o in objects}
+    selected = {o.name for o in context.selected_objects if o.name not in names}
+    active = context.view_layer.objects.active
+    active = active.name if active is not None else None
+
+    collection = _target_collection(context, path)
+
+    for data in import_avorion_xml.DataSnapshot._collections():
+        for block in [d for d in data if d.get(SOURCE_KEY) == path]:
+            if isinstance(block, (Object, Collection)) or block.users == 0:
+                data.remove(block)
+
+    snapshot = import_avorion_xml.DataSnapshot(name)
+    with _active_collection(context, collection):
+        import_avorion_xml.load(context, path, options)
+    for block in snapshot.created():
+        block[SOURCE_KEY] = path
+
+    for obj in (o for o in _tagged(path) if isinstance(o, Object)):
+        if (root := roots.get(obj.name)) is not None:
+            matrix, parent, collections = root
+            obj.parent = parent
+            obj.matrix_world = matrix
+            for c in collections:
+                if c.get(SOURCE_KEY) != path and c not in obj.users_collection:
+                    c.objects.link(obj)
+
+        # modifiers the import created itself are already there
+        for modifier_name, modifier_type, settings in modifiers.get(obj.name, ()):
+            if obj.modifiers.get(modifier_name) is None:
+                _apply_settings(obj.modifiers.new(modifier_name, modifier_type), settings)
+
+    for obj in context.scene.objects:
+        obj.select_set(obj.name in selected)
+    if active is not None and active not in names and active in bpy.data.objects:
+        context.view_layer.objects.active = bpy.data.objects[active]
+
+
+def _poll() -> float | None:
+    if not len(_watcher):
+        return None
+
+    for path in _watcher.paths():
+        # the design was deleted from the scene or another file was opened
+        if not _in_scene(path):
+            unwatch_file(path)
+
+    wm = bpy.context.window_manager
+    window = wm.windows[0] if wm.windows else None
+
+    for path in _watcher.poll():
+        try:
+            with bpy.context.temp_override(window=window):
+                reimport(bpy.context, path)
+        except Exception as e:
+            print(f"Avorion re-import of {path} failed: {e}")
+
+    return POLL_INTERVAL if len(_watcher) else None
+
+
+class AVORION_OT_unwatch(Operator):
+    """Stop re-importing the design when it changes"""
+    bl_idname = "avorion.unwatch"
+    bl_label = "Stop Watching"
+
+    path: bpy.props.StringProperty(subtype='FILE_PATH', options={'HIDDEN'})
+
+    def execute(self, context):
+        if self.path:
+            unwatch_file(self.path)
+        else:
+            _watcher.clear()
+            _options.clear()
+        return {'FINISHED'}
+
+
+class AVORION_PT_watch(Panel):
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Avorion"
+    bl_label = "Watched Designs"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        if not len(_watcher):
+            layout.label(text="Import with Watch File enabled")
+            return
+
+        for path in _watcher.paths():
+            row = layout.row(align=True)
+            row.label(text=Path(path).name, icon='FILE_REFRESH')
+            row.operator(AVORION_OT_unwatch.bl_idname, text="", icon='X').path = path
+        layout.operator(AVORION_OT_unwatch.bl_idname, text="Stop Watching All").path = ""
+
+
+classes = (
+    AVORION_OT_unwatch,
+    AVORION_PT_watch,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.unregister(_poll)
+    _watcher.clear()
+    _options.clear()
+
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)